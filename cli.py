@@ -1,7 +1,10 @@
 # Command Line Interface
 import argparse
+import json
+import os
 import sys
-from main import QuantumApp
+from core.main import QuantumApp
+from core.profiler import Profiler
 
 
 def main():
@@ -12,15 +15,47 @@ def main():
 
     # 'run' command: simulate and show results
     run_parser = subparsers.add_parser("run", help="Simulate a .qlite file")
-    run_parser.add_argument("file", help="Path to the .qlite source file")
+    run_parser.add_argument("file", nargs="+", help="Path(s) to .qlite files, directories or globs")
     run_parser.add_argument("-q", "--qubits", type=int, default=5, help="Number of qubits")
     run_parser.add_argument("-v", "--visualize", action="store_true", help="Show probability histogram")
     run_parser.add_argument("-a", "--ascii", action="store_true", help="Force ASCII visualization")
+    run_parser.add_argument("--profile", metavar="OUT_JSON", help="Write per-stage and per-gate timings to a JSON file")
+    run_parser.add_argument("--checkpoint", metavar="PATH", help="Checkpoint file (default: <file>.ckpt)")
+    run_parser.add_argument("--checkpoint-every", type=int, metavar="N", help="Auto-checkpoint every N gates")
+    run_parser.add_argument("--checkpoint-seconds", type=float, metavar="T", help="Auto-checkpoint every T seconds")
+    run_parser.add_argument("--resume", action="store_true", help="Resume from the checkpoint file")
+    run_parser.add_argument("--drop-measured", action="store_true", help="Drop qubits from the state once measured for the last time")
+    run_parser.add_argument("--shards", type=int, metavar="N", help="Split the state across N worker processes (power of two)")
+    run_parser.add_argument("--transport", choices=["shm", "socket"], default="shm", help="How shards exchange amplitudes (with --shards)")
+    run_parser.add_argument("--prefix-cache", metavar="DIR", help="Reuse simulated circuit prefixes from earlier runs stored in DIR")
+    run_parser.add_argument("--limit", type=int, default=32, help="Histogram rows to show; the rest are summed as 'other'")
+    run_parser.add_argument("--bin", type=int, metavar="K", help="Histogram: group states by their first K qubits")
+    run_parser.add_argument("--marginals", action="store_true", help="Histogram: add per-qubit P(q=1) bars")
+    run_parser.add_argument("--top-k", type=int, default=32, help="Batch mode: most likely states to report per file")
+    run_parser.add_argument("--shots", type=int, help="Batch mode: sample this many measurements into counts")
 
     # 'transpile' command: convert to OpenQASM
     trans_parser = subparsers.add_parser("transpile", help="Convert .qlite to OpenQASM")
-    trans_parser.add_argument("file", help="Path to the .qlite source file")
+    trans_parser.add_argument("file", nargs="+", help="Path(s) to .qlite files, directories or globs")
     trans_parser.add_argument("-o", "--output", default="output.qasm", help="Output filename")
+    trans_parser.add_argument("-q", "--qubits", type=int, default=5, help="Number of qubits")
+    trans_parser.add_argument("--out-dir", metavar="DIR", help="Batch mode: directory for .qasm files (default: next to each source)")
+    trans_parser.add_argument("--coupling-map", metavar="JSON", help="Route onto the hardware connectivity in this JSON file")
+
+    # Batch mode options shared by run and transpile
+    for sub in (run_parser, trans_parser):
+        sub.add_argument("-j", "--jobs", type=int, help="Process files in parallel on N workers (batch mode)")
+        sub.add_argument("--chunksize", type=int, help="Files handed to a worker at a time (default: automatic)")
+        sub.add_argument("--jsonl", metavar="PATH", help="Batch mode: write results here instead of stdout")
+
+    # 'serve' command: long-running local job server
+    serve_parser = subparsers.add_parser("serve", help="Run a local job server with warm workers")
+    serve_parser.add_argument("--host", default="127.0.0.1", help="TCP host to bind")
+    serve_parser.add_argument("--port", type=int, default=8765, help="TCP port to bind")
+    serve_parser.add_argument("--unix", metavar="PATH", help="Listen on a Unix socket instead of TCP")
+    serve_parser.add_argument("-j", "--workers", type=int, help="Worker processes (default: CPU count)")
+    serve_parser.add_argument("--memory-budget", type=int, metavar="MB", help="Memory for concurrent simulations (default: half of RAM)")
+    serve_parser.add_argument("--cache-size", type=int, default=256, help="Cached results to keep")
 
     args = parser.parse_args()
 
@@ -28,6 +63,18 @@ def main():
         parser.print_help()
         return
 
+    if args.command == "serve":
+        from core.server import serve
+        serve(host=args.host, port=args.port, unix_path=args.unix, workers=args.workers,
+              memory_budget=args.memory_budget * 2**20 if args.memory_budget else None,
+              cache_size=args.cache_size)
+        return
+
+    if args.jobs or len(args.file) > 1 or not os.path.isfile(args.file[0]):
+        run_batch_mode(args)
+        return
+    args.file = args.file[0]
+
     # 1. Load source code
     try:
         with open(args.file, 'r') as f:
@@ -37,38 +84,120 @@ def main():
         sys.exit(1)
 
     # 2. Initialize the App
-    app = QuantumApp(num_qubits=args.qubits)
+    profiler = Profiler() if getattr(args, "profile", None) else None
+    prefix_cache = None
+    if getattr(args, "prefix_cache", None):
+        from core.prefix_cache import PrefixCache
+        prefix_cache = PrefixCache(spill_dir=args.prefix_cache)
+    coupling_map = None
+    if getattr(args, "coupling_map", None):
+        from core.routing import CouplingMap
+        coupling_map = CouplingMap.from_json(args.coupling_map)
+    app = QuantumApp(num_qubits=getattr(args, "qubits", 5), profiler=profiler,
+                     prefix_cache=prefix_cache, coupling_map=coupling_map)
 
     # 3. Handle Commands
     if args.command == "run":
         app.compile(source)
-        app.run()
+        if args.shards:
+            run_sharded(app, args)
+            return
+        checkpoint = args.checkpoint or f"{args.file}.ckpt"
+        autosave = args.checkpoint_every or args.checkpoint_seconds
+        if args.resume and not os.path.exists(checkpoint):
+            print(f"Error: Checkpoint '{checkpoint}' not found.")
+            sys.exit(1)
+        app.run(resume_from=checkpoint if args.resume else None,
+                checkpoint_path=checkpoint if autosave else None,
+                checkpoint_every=args.checkpoint_every,
+                checkpoint_seconds=args.checkpoint_seconds,
+                drop_measured=args.drop_measured)
+        if prefix_cache is not None:
+            prefix_cache.persist()
+        for reg, bit in app.sim.classical_bits.items():
+            print(f"{reg} = {bit}")
         
-        # Get probabilities from the simulator
-        probs = app.sim.get_probabilities()
+        # The plotter works straight from the state vector; no 2^n dict is built
+        histogram = dict(limit=args.limit, bin_qubits=args.bin, marginals=args.marginals)
 
         # Visualization Logic
         if args.ascii:
             from core.ascii_plotter import print_ascii_histogram
-            print_ascii_histogram(probs)
+            print_ascii_histogram(app.sim.state, **histogram)
         elif args.visualize:
             try:
                 from core.visualizer import plot_probabilities
-                plot_probabilities(probs)
+                plot_probabilities(app.sim.get_probabilities())
             except Exception:
                 print("\n[!] GUI Visualization failed (possibly Termux/Headless).")
                 print("Falling back to ASCII...")
                 from core.ascii_plotter import print_ascii_histogram
-                print_ascii_histogram(probs)
+                print_ascii_histogram(app.sim.state, **histogram)
         else:
             # Default to state vector print if no flags are passed
             print("\nSimulation complete. Use --visualize or --ascii to see results.")
+
+        if profiler is not None:
+            profiler.dump(args.profile)
+            print(f"Profile written to {args.profile}")
             
     elif args.command == "transpile":
         app.compile(source)
         app.export_qasm(args.output)
         print(f"Successfully transpiled to {args.output}")
 
+def run_sharded(app, args):
+    """Runs the compiled circuit on the sharded backend and reports its communication."""
+    from core.distributed import ShardedSimulator
+    from core.ascii_plotter import print_ascii_histogram
+
+    try:
+        sim = ShardedSimulator(app.num_qubits, args.shards, args.transport,
+                               profiler=app.profiler, seed=app.seed)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    with sim:
+        report = sim.run_program(app.circuit)
+        state = sim.get_statevector()
+    print(f"{report['gates']} gates on {args.shards} shards: {report['exchanges']} exchanges, "
+          f"{report['exchange_bytes'] / 2**20:.2f} MiB moved in {report['seconds']:.3f}s")
+    for reg, bit in sim.classical_bits.items():
+        print(f"{reg} = {bit}")
+    if args.ascii or args.visualize:
+        print_ascii_histogram(state, limit=args.limit, bin_qubits=args.bin, marginals=args.marginals)
+    if app.profiler is not None:
+        app.profiler.dump(args.profile)
+        print(f"Profile written to {args.profile}")
+
+def run_batch_mode(args):
+    """Runs or transpiles many files in parallel, streaming one JSON line per file."""
+    from core.batch import expand_paths, run_batch
+
+    paths = expand_paths(args.file)
+    if not paths:
+        print(f"Error: No source files match {' '.join(args.file)}.")
+        sys.exit(1)
+    options = {}
+    if args.command == "run":
+        options = {'top_k': args.top_k, 'drop_measured': args.drop_measured}
+        if args.shots:
+            options['shots'] = args.shots
+    elif args.coupling_map:
+        with open(args.coupling_map, 'r') as f:
+            options['coupling_map'] = json.load(f)
+    out = open(args.jsonl, 'w') if args.jsonl else sys.stdout
+    try:
+        ok, failed = run_batch(paths, args.command, args.qubits, options,
+                               workers=args.jobs, chunksize=args.chunksize, out=out,
+                               out_dir=getattr(args, "out_dir", None))
+    finally:
+        if args.jsonl:
+            out.close()
+    print(f"{ok} succeeded, {failed} failed", file=sys.stderr)
+    if failed:
+        sys.exit(1)
+
 if __name__ == "__main__":
     main()
 
@@ -1,49 +1,125 @@
-import math
+import sys
 
-def print_ascii_histogram(probabilities, precision=4):
+import numpy as np
+
+# Rows shown before the remaining states are folded into an "other" bucket
+DEFAULT_LIMIT = 32
+BAR_WIDTH = 30
+# Block characters: Full '█', Half '▌', or Hash '#' for maximum compatibility
+FULL_BLOCK = "█"
+
+
+def _distribution(probabilities):
     """
-    Renders a text-based histogram of quantum state probabilities.
-    Perfect for Termux, SSH, and headless environments.
+    Normalizes the accepted inputs into (indices, probabilities, num_qubits).
+    Accepts a {bitstring: probability} dict, a real probability array, or a
+    complex state vector (probabilities are taken as |amplitude|^2).
     """
-    print("\n" + "="*50)
-    print(f"{'STATE':<10} | {'PROBABILITY':<30} | {'%'}")
-    print("-" * 50)
+    if isinstance(probabilities, dict):
+        if not probabilities:
+            return np.zeros(0, dtype=np.int64), np.zeros(0), 0
+        num_qubits = len(next(iter(probabilities)))
+        indices = np.fromiter((int(s, 2) for s in probabilities), dtype=np.int64,
+                              count=len(probabilities))
+        values = np.fromiter(probabilities.values(), dtype=float, count=len(probabilities))
+        return indices, values, num_qubits
+    values = np.asarray(probabilities)
+    if np.iscomplexobj(values):
+        values = np.abs(values)**2
+    num_qubits = int(len(values)).bit_length() - 1
+    return np.arange(len(values), dtype=np.int64), values, num_qubits
 
-    # Filter out near-zero probabilities for a cleaner view
-    active_states = {s: p for s, p in probabilities.items() if round(p, precision) > 0}
-    
-    if not active_states:
-        print("No measurable states detected (Zero State).")
+
+def _top(indices, values, limit):
+    """Positions of the `limit` largest values, most likely first (vectorized)."""
+    if limit is None or limit >= len(values):
+        return np.argsort(-values, kind='stable')
+    top = np.argpartition(values, len(values) - limit)[len(values) - limit:]
+    return top[np.argsort(-values[top], kind='stable')]
+
+
+def _bar(prob):
+    # We ensure at least 1 block if prob > 0
+    return FULL_BLOCK * (max(1, int(prob * BAR_WIDTH)) if prob > 0 else 0)
+
+
+def _row(label, prob, label_width=10):
+    return f"{label:<{label_width}} | {_bar(prob):<30} | {prob * 100:>6.1f}%"
+
+
+def histogram_lines(probabilities, precision=4, limit=DEFAULT_LIMIT, sort='state',
+                    bin_qubits=None, marginals=False):
+    """
+    Yields the histogram one line at a time. Only the `limit` most likely
+    states get a row; the rest are summed into an "other states" bucket.
+    `bin_qubits=k` groups states by their first k qubits, `marginals=True`
+    appends P(q=1) bars for every qubit.
+    """
+    indices, values, num_qubits = _distribution(probabilities)
+    qubit_indices, qubit_values = indices, values
+    if bin_qubits is not None and bin_qubits < num_qubits:
+        shift = num_qubits - bin_qubits
+        values = np.bincount(indices >> shift, weights=values, minlength=2**bin_qubits)
+        indices = np.arange(len(values), dtype=np.int64)
+        width, suffix = bin_qubits, "*"
+    else:
+        width, suffix = num_qubits, ""
+    label_width = max(10, width + len(suffix) + 3)
+    rule = 40 + label_width
+
+    yield "\n" + "=" * rule
+    yield f"{'STATE':<{label_width}} | {'PROBABILITY':<30} | {'%'}"
+    yield "-" * rule
+
+    nonzero = np.flatnonzero(values)
+    if len(nonzero) == 0:
+        yield "No measurable states detected (Zero State)."
         return
 
-    # Configuration for the bar chart
-    max_width = 30
-    # Block characters: Full '█', Half '▌', or Hash '#' for maximum compatibility
-    full_block = "█"
-    
-    # Sort by state string (e.g., |00>, |01>)
-    for state in sorted(active_states.keys()):
-        prob = active_states[state]
-        
-        # Calculate bar length
-        # We ensure at least 1 block if prob > 0
-        bar_length = max(1, int(prob * max_width)) if prob > 0 else 0
-        bar = full_block * bar_length
-        
-        # Format strings for alignment
-        state_label = f"|{state}>"
-        percentage = f"{prob * 100:>6.1f}%"
-        
-        print(f"{state_label:<10} | {bar:<30} | {percentage}")
-
-    print("="*50 + "\n")
-
-def print_state_vector(state_vector):
-    """Displays the raw complex amplitudes for debugging."""
-    print("Raw State Vector Amplitudes:")
-    for i, amp in enumerate(state_vector):
-        if abs(amp) > 1e-6:
-            # Format complex numbers: (real + imag j)
-            print(f"|{bin(i)[2:].zfill(int(math.log2(len(state_vector))))}>: {amp:.4f}")
-          
+    shown = nonzero[_top(indices[nonzero], values[nonzero], limit)]
+    # Filter out near-zero probabilities for a cleaner view
+    shown = shown[np.round(values[shown], precision) > 0]
+    if sort == 'state':
+        shown = shown[np.argsort(indices[shown], kind='stable')]
+    for i in shown:
+        yield _row(f"|{int(indices[i]):0{width}b}{suffix}>", float(values[i]), label_width)
+
+    # Everything without a row of its own, however small, lands in one bucket
+    hidden = len(nonzero) - len(shown)
+    rest = float(values.sum() - values[shown].sum())
+    if hidden and round(rest, precision) > 0:
+        yield _row(f"other ({hidden})", rest, label_width)
+
+    if marginals:
+        yield "-" * rule
+        for qubit in range(num_qubits):
+            bit = (qubit_indices >> (num_qubits - 1 - qubit)) & 1
+            yield _row(f"P(q{qubit}=1)", float(qubit_values[bit == 1].sum()), label_width)
+
+    yield "=" * rule + "\n"
 
+
+def print_ascii_histogram(probabilities, precision=4, limit=DEFAULT_LIMIT, sort='state',
+                          bin_qubits=None, marginals=False, file=None):
+    """
+    Renders a text-based histogram of quantum state probabilities.
+    Perfect for Termux, SSH, and headless environments. Lines are written as
+    they are produced, so output time tracks what is printed, not 2^n.
+    """
+    out = file or sys.stdout
+    for line in histogram_lines(probabilities, precision, limit, sort, bin_qubits, marginals):
+        print(line, file=out)
+
+
+def print_state_vector(state_vector, threshold=1e-6, limit=None, file=None):
+    """Displays the raw complex amplitudes for debugging."""
+    out = file or sys.stdout
+    state_vector = np.asarray(state_vector)
+    width = int(len(state_vector)).bit_length() - 1
+    nonzero = np.flatnonzero(np.abs(state_vector) > threshold)
+    print("Raw State Vector Amplitudes:", file=out)
+    for i in nonzero[:limit]:
+        # Format complex numbers: (real + imag j)
+        print(f"|{int(i):0{width}b}>: {state_vector[i]:.4f}", file=out)
+    if limit is not None and len(nonzero) > limit:
+        print(f"... {len(nonzero) - limit} more nonzero amplitudes", file=out)
@@ -0,0 +1,130 @@
+import glob
+import itertools
+import json
+import os
+import sys
+import time
+from contextlib import redirect_stdout
+
+from . import jobs
+
+# File extensions picked up when a directory is given
+SOURCE_EXTENSIONS = ('.qlite', '.ql')
+
+
+def expand_paths(patterns):
+    """
+    Expands files, directories (searched recursively for Q-Lite sources) and
+    glob patterns into a sorted list of unique file paths.
+    """
+    found = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for root, _, names in os.walk(pattern):
+                found.update(os.path.join(root, name) for name in names
+                             if name.endswith(SOURCE_EXTENSIONS))
+        elif os.path.isfile(pattern):
+            found.add(pattern)
+        else:
+            found.update(p for p in glob.glob(pattern, recursive=True) if os.path.isfile(p))
+    return sorted({os.path.normpath(path) for path in found})
+
+
+def qasm_paths(paths, out_dir=None):
+    """
+    Maps each source to the .qasm file transpile writes: next to the source,
+    or under `out_dir` mirroring the source's directory relative to the
+    common root of all inputs, so same-named files never share an output.
+    """
+    if not paths:
+        return {}
+    dirs = [os.path.dirname(os.path.abspath(path)) for path in paths]
+    root = os.path.commonpath(dirs)
+    targets = {}
+    for path, directory in zip(paths, dirs):
+        stem = os.path.splitext(os.path.basename(path))[0]
+        if out_dir:
+            directory = os.path.normpath(os.path.join(out_dir, os.path.relpath(directory, root)))
+        else:
+            directory = os.path.dirname(path)
+        targets[path] = os.path.join(directory, stem + ".qasm")
+    return targets
+
+
+def process_file(task):
+    """
+    Runs one (path, command, qubits, options, qasm_path) task and returns its
+    JSONL record. Never raises: failures become records with ok=False.
+    """
+    path, command, qubits, options, qasm_path = task
+    start = time.perf_counter()
+    try:
+        with open(path, 'r') as f:
+            source = f.read()
+        # Lexer/parser diagnostics must not interleave with the JSONL stream
+        with redirect_stdout(sys.stderr):
+            result = jobs.run_job({'command': command, 'source': source,
+                                   'qubits': qubits, 'options': options})
+        if command == 'transpile':
+            if os.path.dirname(qasm_path):
+                os.makedirs(os.path.dirname(qasm_path), exist_ok=True)
+            with open(qasm_path, 'w') as f:
+                f.write(result.pop('qasm'))
+            result['qasm_path'] = qasm_path
+        return dict(file=path, ok=True, **result)
+    except Exception as e:
+        return _failure(path, command, e, time.perf_counter() - start)
+
+
+def _failure(path, command, error, seconds=0.0):
+    return {'file': path, 'command': command, 'ok': False,
+            'error': f"{type(error).__name__}: {error}", 'seconds': seconds}
+
+
+def run_batch(paths, command, qubits, options=None, workers=None, chunksize=None,
+              out=None, out_dir=None):
+    """
+    Processes many files on a pool of warm worker processes and writes one
+    JSON record per file to `out` as results arrive. Returns (ok, failed).
+    """
+    options = options or {}
+    workers = workers or os.cpu_count() or 1
+    targets = qasm_paths(paths, out_dir) if command == 'transpile' else {}
+    # Two sources that would write the same .qasm (x.ql next to x.qlite) are
+    # reported as failures instead of silently overwriting each other
+    writers, collisions = {}, []
+    for path, target in targets.items():
+        key = os.path.abspath(target)
+        if key in writers:
+            collisions.append(_failure(path, command, FileExistsError(
+                f"{target} is already written by {writers[key]}")))
+        else:
+            writers[key] = path
+    colliding = {record['file'] for record in collisions}
+    tasks = [(path, command, qubits, options, targets.get(path))
+             for path in paths if path not in colliding]
+    if chunksize is None:
+        # A few chunks per worker balances load without per-file IPC
+        chunksize = max(1, min(64, len(tasks) // (workers * 4)))
+
+    ok = failed = 0
+    if workers == 1:
+        results = itertools.chain(collisions, map(process_file, tasks))
+        pool = None
+    else:
+        pool = jobs.mp_context().Pool(workers)
+        results = itertools.chain(collisions, pool.imap_unordered(process_file, tasks, chunksize))
+    try:
+        for record in results:
+            if record['ok']:
+                ok += 1
+            else:
+                failed += 1
+            if out is not None:
+                out.write(json.dumps(record) + "\n")
+                out.flush()
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return ok, failed
@@ -0,0 +1,256 @@
+import hashlib
+import re
+
+import numpy as np
+
+from .AST_Node import GateNode, MeasurementNode
+
+# --- Opcodes ---
+# The position in OPCODES is the opcode stored in Circuit.instructions['op'].
+OPCODES = ('H', 'X', 'Y', 'Z', 'RX', 'RY', 'RZ', 'CNOT', 'CCNOT', 'CZ', 'CP', 'SWAP', 'MEASURE')
+OP_INDEX = {name: op for op, name in enumerate(OPCODES)}
+OP_INDEX['TOFFOLI'] = OP_INDEX['CCNOT']
+MEASURE = OP_INDEX['MEASURE']
+PARAMETERIZED = {OP_INDEX[name] for name in ('RX', 'RY', 'RZ', 'CP')}
+
+MAX_OPERANDS = 3
+# Unused qubit operand slots hold -1
+NO_QUBIT = -1
+# 'matrix' value for gates without a table entry (a rotation missing its angle)
+NO_MATRIX = -1
+
+# One row per instruction:
+#   op      opcode (index into OPCODES)
+#   qubits  program qubit operands, padded with NO_QUBIT
+#   param   gate angle as a float (NaN when the gate has none)
+#   matrix  index into Circuit.table for gates, Circuit.registers for MEASURE
+#   stmt    index of the source statement, used for checkpoints and progress
+INSTRUCTION = np.dtype([
+    ('op', np.uint8),
+    ('qubits', np.int32, (MAX_OPERANDS,)),
+    ('param', np.float64),
+    ('matrix', np.int32),
+    ('stmt', np.int32),
+])
+
+
+def parse_qubits(target):
+    """Extracts numerical indices from strings like 'q[0], q[1]'."""
+    if isinstance(target, int):
+        return [target]
+    if not isinstance(target, str):
+        return list(target)
+    return [int(i) for i in re.findall(r'\[(\d+)\]', target)]
+
+
+def parse_operands(target):
+    """
+    Splits 'a[0], b[1]' into [('a', 0), ('b', 1)]. Integer targets are
+    already global qubit indices and get register None.
+    """
+    if isinstance(target, int):
+        return [(None, target)]
+    if not isinstance(target, str):
+        return [(None, int(q)) for q in target]
+    return [(name, int(i)) for name, i in re.findall(r'(\w+)\s*\[(\d+)\]', target)]
+
+
+def _declaration(node):
+    if isinstance(node, tuple) and node[0] == 'DECLARE':
+        return node[1], node[2]
+    if isinstance(node, dict) and node.get('type') == 'DECLARE':
+        return node['id'], node['size']
+    return None
+
+
+class Circuit:
+    """
+    A lowered program: a structured NumPy array with one row per gate or
+    measurement, built once after decomposition and shared by the
+    simulator, the drawer and the transpiler.
+
+    `table` holds each distinct (opcode, angle) pair once; consumers build
+    their per-gate data (kernel parameters, QASM angles) from it instead of
+    once per instruction. `registers` lists the classical registers that
+    MEASURE rows point at, `declarations` the declared quantum registers.
+    Qubit operands are global indices: `qubit_registers` lists every
+    quantum register as (name, offset, size), so a[i] is qubit offset + i;
+    registers used without a declaration follow the declared ones. `layers`,
+    set by core.scheduler.LayerScheduler, gives each instruction's layer.
+    """
+    def __init__(self, instructions, table=(), registers=(), declarations=(),
+                 num_statements=None, layers=None, qubit_registers=None):
+        self.instructions = instructions
+        self.table = list(table)
+        self.registers = list(registers)
+        self.declarations = list(declarations)
+        if qubit_registers is None:
+            qubit_registers, offset = [], 0
+            for name, size in self.declarations:
+                qubit_registers.append((name, offset, size))
+                offset += size
+        self.qubit_registers = list(qubit_registers)
+        if num_statements is None:
+            num_statements = int(instructions['stmt'][-1]) + 1 if len(instructions) else 0
+        self.num_statements = num_statements
+        self.layers = layers
+
+    def __len__(self):
+        return len(self.instructions)
+
+    @property
+    def depth(self):
+        """Number of layers, or None for a circuit that has not been layered."""
+        if self.layers is None:
+            return None
+        return int(self.layers.max()) + 1 if len(self.layers) else 0
+
+    @property
+    def num_qubits(self):
+        """Qubits touched by the circuit (highest operand index + 1)."""
+        if not len(self.instructions):
+            return 0
+        return int(self.instructions['qubits'].max()) + 1
+
+    @classmethod
+    def lower(cls, program):
+        """
+        Lowers a Program (or list of statements) to a Circuit. Raises
+        ValueError for gates QLite cannot execute.
+        """
+        statements = program.statements if hasattr(program, 'statements') else program
+        # Pass 1: registers and operands, so every register's offset is known up front
+        declarations, operands = [], [None] * len(statements)
+        implicit = {}   # undeclared register -> highest index used
+        for pos, node in enumerate(statements):
+            declaration = _declaration(node)
+            if declaration is not None:
+                # A register declared twice is emitted once
+                if all(name != declaration[0] for name, _ in declarations):
+                    declarations.append(declaration)
+                continue
+            if hasattr(node, 'name'):
+                operands[pos] = parse_operands(node.target)
+            elif hasattr(node, 'classical_reg'):
+                operands[pos] = parse_operands(node.qubit)[:1]
+            else:
+                continue
+            for name, index in operands[pos]:
+                if name is not None:
+                    implicit[name] = max(implicit.get(name, -1), index)
+        qubit_registers, offsets = [], {}
+        sizes = dict(declarations)
+        for name, size in declarations + [(name, top + 1) for name, top in implicit.items()
+                                          if name not in sizes]:
+            offset = sum(r[2] for r in qubit_registers)
+            qubit_registers.append((name, offset, size))
+            offsets[name] = offset
+        for name, top in implicit.items():
+            if name in sizes and top >= sizes[name]:
+                raise ValueError(f"Qubit {name}[{top}] is outside register {name}[{sizes[name]}].")
+
+        rows = np.zeros(len(statements), dtype=INSTRUCTION)
+        rows['qubits'] = NO_QUBIT
+        table, table_index = [], {}
+        registers, register_index = [], {}
+        count = 0
+        for pos, node in enumerate(statements):
+            if operands[pos] is None:
+                continue
+            row = rows[count]
+            qubits = [index if name is None else offsets[name] + index
+                      for name, index in operands[pos]]
+            if hasattr(node, 'name'):
+                name = node.name.upper()
+                if name not in OP_INDEX or name == 'MEASURE':
+                    raise ValueError(f"Gate '{node.name}' is not supported by QLite.")
+                op = OP_INDEX[name]
+                angle = getattr(node, 'angle', None)
+                if op in PARAMETERIZED and angle is None:
+                    matrix = NO_MATRIX
+                else:
+                    key = (op, angle if op in PARAMETERIZED else None)
+                    matrix = table_index.get(key)
+                    if matrix is None:
+                        matrix = table_index[key] = len(table)
+                        table.append(key)
+                row['param'] = np.nan if angle is None else float(angle)
+            else:
+                op = MEASURE
+                matrix = register_index.get(node.classical_reg)
+                if matrix is None:
+                    matrix = register_index[node.classical_reg] = len(registers)
+                    registers.append(node.classical_reg)
+                row['param'] = np.nan
+            if len(qubits) > MAX_OPERANDS:
+                raise ValueError(f"Gate '{node.name}' has more than {MAX_OPERANDS} operands.")
+            row['op'] = op
+            row['qubits'][:len(qubits)] = qubits
+            row['matrix'] = matrix
+            row['stmt'] = pos
+            count += 1
+        return cls(rows[:count].copy(), table, registers, declarations, len(statements),
+                   qubit_registers=qubit_registers)
+
+    @classmethod
+    def from_ops(cls, ops):
+        """Builds a Circuit from (name, qubits, angle) tuples, e.g. recorded history."""
+        statements = [MeasurementNode(qubits[0], f"c{qubits[0]}") if name == 'MEASURE'
+                      else GateNode(name, list(qubits), angle) for name, qubits, angle in ops]
+        return cls.lower(statements)
+
+    def reorder(self, order, layers=None):
+        """
+        Returns a copy with instructions in `order`. Statement numbers are
+        renumbered so checkpoints and progress count the new sequence.
+        """
+        instructions = self.instructions[order]
+        instructions['stmt'] = np.arange(len(instructions))
+        return Circuit(instructions, self.table, self.registers, self.declarations,
+                       len(instructions), layers, self.qubit_registers)
+
+    def fingerprint(self, stop=None):
+        """
+        Hex hash of the instructions before statement `stop` (all by default),
+        in order, with the angles and classical registers they refer to.
+        Checkpoints store it so a resume into an edited or reordered program
+        is refused, while gates appended after the saved position still resume.
+        """
+        inst = self.instructions
+        if stop is not None:
+            inst = inst[:int(np.searchsorted(inst['stmt'], stop))]
+        used = [self.registers[m] if op == MEASURE else self.table[m]
+                for op, m in zip(inst['op'].tolist(), inst['matrix'].tolist()) if m != NO_MATRIX]
+        h = hashlib.blake2b(inst.tobytes(), digest_size=16)
+        h.update(repr(used).encode("utf-8"))
+        return h.hexdigest()
+
+    def qubit_labels(self, default='q'):
+        """
+        Source name of every global qubit, e.g. ['a[0]', 'a[1]', 'b[0]'].
+        Qubits outside all registers are named `default`[index].
+        """
+        labels = [f"{default}[{q}]" for q in range(self.num_qubits)]
+        for name, offset, size in self.qubit_registers:
+            for i in range(min(size, max(0, len(labels) - offset))):
+                labels[offset + i] = f"{name}[{i}]"
+        return labels
+
+    def rows(self, start=0):
+        """Yields (op, qubits, matrix, stmt) per instruction from `start` as plain Python values."""
+        inst = self.instructions[start:]
+        counts = (inst['qubits'] != NO_QUBIT).sum(axis=1).tolist()
+        qubits = inst['qubits'].tolist()
+        for op, operands, n, matrix, stmt in zip(inst['op'].tolist(), qubits, counts,
+                                                 inst['matrix'].tolist(), inst['stmt'].tolist()):
+            yield op, operands[:n], matrix, stmt
+
+    def last_use(self):
+        """Maps each program qubit to the index of the last statement touching it."""
+        inst = self.instructions
+        last = np.full(self.num_qubits, -1, dtype=np.int64)
+        for k in range(MAX_OPERANDS):
+            column = inst['qubits'][:, k]
+            used = column != NO_QUBIT
+            np.maximum.at(last, column[used], inst['stmt'][used])
+        return {q: int(pos) for q, pos in enumerate(last) if pos >= 0}
@@ -1,5 +1,5 @@
-from AST_Node import GateNode, Program
-from library import QuantumLibrary
+from .AST_Node import GateNode, Program
+from .library import QuantumLibrary
 
 class Decomposer:
     def __init__(self, ast):
@@ -17,7 +17,7 @@ class Decomposer:
                     new_statements.extend(expanded_gates)
                 else:
                     new_statements.append(node)
-            else isinstance(node, GateNode) and node.name == 'H':
+            elif isinstance(node, GateNode) and node.name == 'H':
                 # Decompose H into: RZ(pi/2), RX(pi/2), RZ(pi/2)
                 # This is a common decomposition for hardware compatibility
                 new_statements.append(GateNode('RZ', node.target, angle=1.5708))
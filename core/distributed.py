@@ -0,0 +1,463 @@
+import socket
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from . import jobs
+from .circuit import Circuit, MEASURE, NO_MATRIX, OPCODES
+from .simulator import _KERNELS, _DISPATCH, _normalize_pauli_terms, _parity_sum
+
+TRANSPORTS = ('shm', 'socket')
+# Gates whose matrices are diagonal never move amplitudes between shards
+DIAGONAL_GATES = {'Z', 'RZ', 'CZ', 'CP'}
+# Gates whose leading operands are controls
+CONTROLLED_GATES = {'CNOT', 'CCNOT', 'CZ', 'CP'}
+# Upcoming gates examined when choosing which local qubit to give up
+REMAP_LOOKAHEAD = 64
+
+
+# --- Worker Side ---
+# A worker owns one shard: the 2^(n-g) amplitudes whose top g index bits
+# equal its rank. Shard axis k is physical qubit g + k.
+
+# Both transports implement exchange(partner, axis, bit): trade this
+# shard's half with local bit 1 - bit for the partner's half with local
+# bit `bit`, where `bit` is this rank's value of the global qubit.
+
+class _ShmTransport:
+    """Exchanges half-shards by copying directly between shared-memory shards."""
+    def __init__(self, rank, shards):
+        self.rank = rank
+        self.shards = shards
+
+    def exchange(self, partner, axis, bit):
+        # Only the lower rank of each pair moves data; both halves live in shared memory
+        if self.rank < partner:
+            ours = _half_view(self.shards[self.rank], axis, 1 - bit)
+            theirs = _half_view(self.shards[partner], axis, bit)
+            tmp = ours.copy()
+            ours[...] = theirs
+            theirs[...] = tmp
+
+    def close(self):
+        pass
+
+
+class _SocketTransport:
+    """
+    Exchanges half-shards over TCP. Each worker listens on its own port;
+    the lower rank of a pair connects on first use. The lower rank sends
+    first and the higher rank receives first, so large transfers never
+    deadlock on full socket buffers.
+    """
+    def __init__(self, rank, shard, listener, addresses):
+        self.rank = rank
+        self.shard = shard
+        self.listener = listener
+        self.addresses = addresses
+        self.peers = {}
+
+    def _peer(self, partner):
+        if partner not in self.peers:
+            if self.rank < partner:
+                conn = socket.create_connection(self.addresses[partner])
+                conn.sendall(self.rank.to_bytes(4, "little"))
+            else:
+                conn, _ = self.listener.accept()
+                partner = int.from_bytes(_recv_exact(conn, 4), "little")
+            self.peers[partner] = conn
+        return self.peers[partner]
+
+    def exchange(self, partner, axis, bit):
+        conn = self._peer(partner)
+        send = _half_view(self.shard, axis, 1 - bit)
+        payload = np.ascontiguousarray(send)
+        received = np.empty_like(payload)
+        if self.rank < partner:
+            conn.sendall(payload.data)
+            _recv_into(conn, received)
+        else:
+            _recv_into(conn, received)
+            conn.sendall(payload.data)
+        send[...] = received
+
+    def close(self):
+        for conn in self.peers.values():
+            conn.close()
+        self.listener.close()
+
+
+def _recv_exact(conn, size):
+    data = bytearray(size)
+    _recv_into(conn, np.frombuffer(data, dtype=np.uint8))
+    return bytes(data)
+
+
+def _recv_into(conn, array):
+    view = memoryview(array).cast("B")
+    while view:
+        n = conn.recv_into(view)
+        if n == 0:
+            raise ConnectionError("Peer closed the exchange connection.")
+        view = view[n:]
+
+
+def _half_view(shard, axis, bit):
+    return shard[(slice(None),) * axis + (bit, Ellipsis)]
+
+
+def _worker(rank, local_qubits, names, transport, conn):
+    """Worker process main loop: applies op lists sent by the coordinator."""
+    segments = [shared_memory.SharedMemory(name=name) for name in names]
+    shape = (2,) * local_qubits
+    shards = [np.ndarray(shape, dtype=complex, buffer=seg.buf) for seg in segments]
+    shard = shards[rank]
+    if transport == 'socket':
+        listener = socket.create_server(("127.0.0.1", 0))
+        conn.send(listener.getsockname())
+        link = _SocketTransport(rank, shard, listener, conn.recv())
+    else:
+        link = _ShmTransport(rank, shards)
+    conn.send('ready')
+    try:
+        while True:
+            message = conn.recv()
+            if message[0] == 'close':
+                break
+            try:
+                for op in message[1]:
+                    _apply(rank, shard, link, op)
+                conn.send(('ok', None))
+            except Exception as e:
+                conn.send(('error', f"{type(e).__name__}: {e}"))
+    finally:
+        link.close()
+        # Views must be gone before the segments can be closed
+        del link, shard, shards
+        for seg in segments:
+            seg.close()
+
+
+def _apply(rank, shard, link, op):
+    kind = op[0]
+    if kind == 'gate':
+        _, name, axes, param, mask, value = op
+        if rank & mask == value:
+            _KERNELS[name][0](shard, axes, param)
+    elif kind == 'scale':
+        _, mask, value, factor = op
+        if rank & mask == value and factor != 1:
+            shard *= factor
+    elif kind == 'exchange':
+        # Swap global bit `gbit` with shard axis `axis`: keep the half whose
+        # local bit equals our global bit, trade the other with the partner
+        _, gbit, axis = op
+        link.exchange(rank ^ gbit, axis, 1 if rank & gbit else 0)
+
+
+# --- Coordinator ---
+
+class ShardedSimulator:
+    """
+    State-vector simulator whose amplitudes are split across `shards`
+    worker processes (a power of two). Qubit 0 is the most significant
+    bit, so the top log2(shards) physical qubits are "global": they select
+    the shard. Gates on local qubits run in parallel on every shard;
+    controls and diagonal gates on global qubits become per-shard
+    conditions or phases. A non-diagonal gate on a global qubit is
+    preceded by a remapping swap with an idle local qubit, in which
+    partner shards trade half their amplitudes.
+
+    Shards live in shared memory. With transport='shm' exchanges copy
+    between shards directly; with transport='socket' partners stream
+    their halves over TCP, as they would between machines. Measurement
+    and expectation values are computed by the coordinator straight from
+    the shared shards between rounds.
+    """
+    def __init__(self, num_qubits, shards=2, transport='shm', profiler=None, seed=None):
+        if shards < 1 or shards & (shards - 1):
+            raise ValueError("'shards' must be a power of two.")
+        global_qubits = shards.bit_length() - 1
+        if global_qubits >= num_qubits:
+            raise ValueError(f"{shards} shards need more than {global_qubits} qubits.")
+        if transport not in TRANSPORTS:
+            raise ValueError(f"'transport' must be one of {', '.join(TRANSPORTS)}.")
+        self.num_qubits = num_qubits
+        self.num_shards = shards
+        self.global_qubits = global_qubits
+        self.local_qubits = num_qubits - global_qubits
+        self.transport = transport
+        self.profiler = profiler
+        # Physical position of each logical qubit
+        self.layout = list(range(num_qubits))
+        # Measurement results by classical register name
+        self.classical_bits = {}
+        self.rng = np.random.default_rng(seed)
+        # Totals over the simulator's lifetime
+        self.exchanges = 0
+        self.exchange_bytes = 0
+
+        shard_bytes = 16 * 2**self.local_qubits
+        self._segments, self._shards, self._conns, self._procs = [], None, [], []
+        try:
+            for _ in range(shards):
+                self._segments.append(shared_memory.SharedMemory(create=True, size=shard_bytes))
+            shape = (2**self.local_qubits,)
+            self._shards = [np.ndarray(shape, dtype=complex, buffer=seg.buf)
+                            for seg in self._segments]
+            for rank in range(shards):
+                self._shards[rank][:] = 0
+            self._shards[0][0] = 1.0
+
+            ctx = jobs.mp_context()
+            names = [seg.name for seg in self._segments]
+            for rank in range(shards):
+                parent, child = ctx.Pipe()
+                proc = ctx.Process(target=_worker, daemon=True,
+                                   args=(rank, self.local_qubits, names, transport, child))
+                proc.start()
+                child.close()
+                self._conns.append(parent)
+                self._procs.append(proc)
+            if transport == 'socket':
+                addresses = [conn.recv() for conn in self._conns]
+                for conn in self._conns:
+                    conn.send(addresses)
+            for conn in self._conns:
+                conn.recv()
+        except BaseException:
+            # A worker died during start-up (recv raises EOFError): nothing may outlive us
+            self._abort()
+            raise
+
+    def _abort(self):
+        """Kills whatever workers started and unlinks the shared memory created so far."""
+        for proc in self._procs:
+            proc.terminate()
+        for proc in self._procs:
+            proc.join()
+        for conn in self._conns:
+            conn.close()
+        self._procs = None
+        self._shards = None
+        for seg in self._segments:
+            seg.close()
+            seg.unlink()
+
+    # --- Lifecycle ---
+    def close(self):
+        """Stops the workers and frees the shared memory."""
+        if self._procs is None:
+            return
+        for conn in self._conns:
+            conn.send(('close',))
+        for proc in self._procs:
+            proc.join()
+        self._procs = None
+        self._shards = None
+        for seg in self._segments:
+            seg.close()
+            seg.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- State Access ---
+    def get_statevector(self):
+        """Gathers the shards into one vector in logical qubit order."""
+        physical = np.concatenate(self._shards).reshape((2,) * self.num_qubits)
+        return np.ascontiguousarray(physical.transpose(self.layout)).reshape(-1)
+
+    def get_probabilities(self):
+        """Returns a dictionary mapping bitstrings to probabilities."""
+        probs = np.abs(self.get_statevector())**2
+        return {format(i, f'0{self.num_qubits}b'): float(p) for i, p in enumerate(probs)}
+
+    def expectation(self, pauli_terms):
+        """
+        Returns <psi|O|psi> for a weighted sum of Pauli strings, as
+        Simulator.expectation. X/Y on a global qubit pair each shard with
+        the partner shard across that bit; no state is gathered. Terms are
+        grouped by their global and local flip masks, so each shard builds
+        one overlap per group and every term only reduces it.
+        """
+        g = self.global_qubits
+        shape = (2,) * self.local_qubits
+        groups = {}
+        for pauli, coeff in _normalize_pauli_terms(pauli_terms):
+            if len(pauli) != self.num_qubits:
+                raise ValueError(f"Pauli string '{pauli}' does not match {self.num_qubits} qubits.")
+            phys = {self.layout[k]: p for k, p in enumerate(pauli) if p != 'I'}
+            flip_mask = sum(1 << (g - 1 - q) for q, p in phys.items() if q < g and p in 'XY')
+            parity_mask = sum(1 << (g - 1 - q) for q, p in phys.items() if q < g and p in 'YZ')
+            local_flip = tuple(sorted(q - g for q, p in phys.items() if q >= g and p in 'XY'))
+            local_parity = [q - g for q, p in phys.items() if q >= g and p in 'YZ']
+            groups.setdefault((flip_mask, local_flip), []).append(
+                (parity_mask, local_parity, coeff * 1j ** pauli.count('Y')))
+
+        total = 0j
+        for (flip_mask, local_flip), terms in groups.items():
+            for rank, shard in enumerate(self._shards):
+                shard = shard.reshape(shape)
+                if flip_mask or local_flip:
+                    partner = self._shards[rank ^ flip_mask].reshape(shape)
+                    if local_flip:
+                        partner = np.flip(partner, axis=local_flip)
+                    overlap = np.conj(partner) * shard
+                else:
+                    overlap = np.abs(shard)**2
+                for parity_mask, local_parity, weight in terms:
+                    sign = -1 if bin(rank & parity_mask).count('1') % 2 else 1
+                    total += weight * sign * _parity_sum(overlap, local_parity)
+        return float(total.real)
+
+    def measure(self, qubit):
+        """Projectively measures logical `qubit`, collapsing every shard; returns 0/1."""
+        g = self.global_qubits
+        phys = self.layout[qubit]
+        if phys < g:
+            bit = 1 << (g - 1 - phys)
+            halves = [(shard, 1 if rank & bit else 0) for rank, shard in enumerate(self._shards)]
+        else:
+            # View each shard as (before, qubit, after) and split on the middle axis
+            axis = phys - g
+            halves = [(shard.reshape(2**axis, 2, -1)[:, b], b)
+                      for shard in self._shards for b in (0, 1)]
+        p1 = sum(float(np.vdot(view, view).real) for view, b in halves if b == 1)
+        outcome = int(self.rng.random() < p1)
+        norm = np.sqrt(p1 if outcome else 1.0 - p1)
+        for view, b in halves:
+            if b == outcome:
+                view /= norm
+            else:
+                view[...] = 0
+        return outcome
+
+    # --- Execution ---
+    def apply_gate(self, gate_name, target_indices, angle=None):
+        if isinstance(target_indices, int):
+            target_indices = [target_indices]
+        return self.run_program(Circuit.from_ops([(gate_name, target_indices, angle)]))
+
+    def run_program(self, program):
+        """
+        Executes a Circuit (or an AST, which is lowered first). Returns the
+        circuit's communication report:
+        {'gates', 'exchanges', 'exchange_bytes', 'seconds'}.
+        """
+        circuit = program if isinstance(program, Circuit) else Circuit.lower(program)
+        start = time.perf_counter()
+        exchanges, gates = self.exchanges, 0
+        ops = []
+        params = [None if op == MEASURE else _DISPATCH[op][1](angle) for op, angle in circuit.table]
+        rows = list(circuit.rows())
+        for i, (op, qubits, matrix, _) in enumerate(rows):
+            if op == MEASURE:
+                # Workers are idle between rounds, so the shards can be collapsed in place
+                self._dispatch(ops)
+                ops = []
+                self.classical_bits[circuit.registers[matrix]] = self.measure(qubits[0])
+                continue
+            if matrix == NO_MATRIX:
+                continue
+            gates += 1
+            name = OPCODES[op]
+            if name == 'SWAP':
+                # Relabel instead of moving amplitudes
+                a, b = qubits
+                self.layout[a], self.layout[b] = self.layout[b], self.layout[a]
+                continue
+            moving = self._moving_operands(name, qubits)
+            for q in moving:
+                if self.layout[q] < self.global_qubits:
+                    ops.append(self._remap(q, qubits, moving, rows[i + 1:i + 1 + REMAP_LOOKAHEAD]))
+            ops.extend(self._lower_gate(name, qubits, params[matrix]))
+        self._dispatch(ops)
+
+        report = {'gates': gates, 'exchanges': self.exchanges - exchanges,
+                  'exchange_bytes': (self.exchanges - exchanges) * self._exchange_size(),
+                  'seconds': time.perf_counter() - start}
+        self.exchange_bytes += report['exchange_bytes']
+        if self.profiler is not None:
+            self.profiler.record('stage', 'sharded_run', report['seconds'], report['exchange_bytes'])
+            self.profiler.count('exchanges', report['exchanges'])
+            self.profiler.count('exchange_bytes', report['exchange_bytes'])
+        return report
+
+    def _exchange_size(self):
+        # Every shard sends half its amplitudes to its partner
+        return self.num_shards * 16 * 2**self.local_qubits // 2
+
+    @staticmethod
+    def _moving_operands(name, qubits):
+        """Operands whose amplitudes a gate mixes (must be local)."""
+        if name in DIAGONAL_GATES:
+            return []
+        return qubits[-1:] if name in CONTROLLED_GATES else qubits
+
+    def _remap(self, qubit, operands, moving, upcoming):
+        """
+        Swaps logical `qubit` off its global position with the local qubit
+        needed latest. Idle qubits go first; a control of the same gate may
+        be used when no other local qubit is left, since controls work from
+        global positions too.
+        """
+        uses = {}
+        for op, qubits, _, _ in upcoming:
+            for q in qubits:
+                uses[q] = uses.get(q, 0) + 1
+        candidates = [q for q in range(self.num_qubits)
+                      if self.layout[q] >= self.global_qubits and q not in moving]
+        if not candidates:
+            raise ValueError("No local qubit to remap; use fewer shards.")
+        victim = min(candidates, key=lambda q: (q in operands, uses.get(q, 0)))
+        g, l = self.layout[qubit], self.layout[victim]
+        self.layout[qubit], self.layout[victim] = l, g
+        self.exchanges += 1
+        return ('exchange', 1 << (self.global_qubits - 1 - g), l - self.global_qubits)
+
+    def _lower_gate(self, name, qubits, param):
+        """Turns one gate into worker ops on shard axes plus global-bit conditions."""
+        phys = [self.layout[q] for q in qubits]
+        g = self.global_qubits
+        if name in ('Z', 'RZ') and phys[0] < g:
+            bit = 1 << (g - 1 - phys[0])
+            return [('scale', bit, 0, param[0]), ('scale', bit, bit, param[1])]
+        if name in CONTROLLED_GATES:
+            # Global operands become a condition on the shard's rank; every
+            # operand of a controlled phase is symmetric, a CNOT target is local
+            conditions = phys if name in DIAGONAL_GATES else phys[:-1]
+            mask = sum(1 << (g - 1 - p) for p in conditions if p < g)
+            local = [p - g for p in phys if p >= g]
+            if not local:
+                return [('scale', mask, mask, param)]
+            return [('gate', name, local, param, mask, mask)]
+        return [('gate', name, [p - g for p in phys], param, 0, 0)]
+
+    def _dispatch(self, ops):
+        """
+        Sends ops to every worker. Each exchange runs as its own round, so
+        no shard is still applying earlier gates while its halves move.
+        """
+        segment = []
+        for op in ops:
+            if op[0] == 'exchange':
+                self._round(segment)
+                self._round([op])
+                segment = []
+            else:
+                segment.append(op)
+        self._round(segment)
+
+    def _round(self, segment):
+        if not segment:
+            return
+        for conn in self._conns:
+            conn.send(('run', segment))
+        errors = [reply[1] for reply in [conn.recv() for conn in self._conns] if reply[0] != 'ok']
+        if errors:
+            raise RuntimeError(errors[0])
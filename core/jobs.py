@@ -0,0 +1,115 @@
+import hashlib
+import json
+import multiprocessing
+import time
+
+import numpy as np
+
+from .main import QuantumApp
+from .routing import CouplingMap
+
+COMMANDS = ('compile', 'run', 'transpile')
+
+# complex128 amplitudes plus headroom for kernel temporaries
+BYTES_PER_AMPLITUDE = 32
+
+
+def mp_context():
+    """
+    Multiprocessing context for job workers. Prefers forkserver: workers are
+    forked from a clean process that has already imported core.jobs (numpy,
+    lexer, PLY tables), so each starts warm and, unlike plain fork, never
+    inherits the parent's sockets or threads.
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        ctx = multiprocessing.get_context('forkserver')
+        ctx.set_forkserver_preload(['core.jobs'])
+        return ctx
+    return multiprocessing.get_context('spawn')
+
+
+def validate_job(job):
+    """Raises ValueError unless `job` is a well-formed job dictionary."""
+    if not isinstance(job, dict):
+        raise ValueError("A job must be a JSON object.")
+    if job.get('command') not in COMMANDS:
+        raise ValueError(f"'command' must be one of {', '.join(COMMANDS)}.")
+    if not isinstance(job.get('source'), str):
+        raise ValueError("'source' must be a string of Q-Lite code.")
+    qubits = job.get('qubits')
+    if not isinstance(qubits, int) or isinstance(qubits, bool) or qubits < 1:
+        raise ValueError("'qubits' must be a positive integer.")
+    if not isinstance(job.get('options', {}), dict):
+        raise ValueError("'options' must be an object.")
+
+
+def job_key(job):
+    """Hash of everything that determines a job's result."""
+    payload = json.dumps([job['command'], job['source'], job['qubits'],
+                          job.get('options', {})], sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def job_memory(job):
+    """Estimated peak bytes a job needs; compile-only jobs never allocate 2^n."""
+    if job['command'] != 'run':
+        return 0
+    return BYTES_PER_AMPLITUDE * 2**job['qubits']
+
+
+def is_deterministic(job):
+    """A run with measurements but no fixed seed must not be served from a cache."""
+    return job['command'] != 'run' or '=>' not in job['source'] or \
+        job.get('options', {}).get('seed') is not None
+
+
+def top_probabilities(state, k):
+    """Returns the k most likely basis states as {bitstring: probability}."""
+    probs = np.abs(state)**2
+    num_qubits = int(len(probs)).bit_length() - 1
+    k = min(k, len(probs))
+    if k <= 0:
+        return {}
+    top = np.argpartition(probs, len(probs) - k)[len(probs) - k:]
+    top = top[np.argsort(-probs[top], kind='stable')]
+    return {format(int(i), f'0{num_qubits}b'): float(probs[i])
+            for i in top if probs[i] > 1e-12}
+
+
+def sample_counts(sim, shots):
+    """Samples `shots` full-register measurements from the simulator's state."""
+    probs = np.abs(sim.state)**2
+    hits = sim.rng.multinomial(shots, probs / probs.sum())
+    return {format(int(i), f'0{sim.num_qubits}b'): int(hits[i]) for i in np.flatnonzero(hits)}
+
+
+def run_job(job, progress=None):
+    """
+    Executes one job in this process and returns its result dictionary.
+    Options: hardware_optimize (default True), seed, drop_measured, top_k,
+    shots (sample that many measurements of the final state into counts) and
+    coupling_map (route the QASM onto it; see CouplingMap.from_spec).
+    """
+    options = job.get('options', {})
+    start = time.perf_counter()
+    coupling_map = options.get('coupling_map')
+    if coupling_map is not None:
+        coupling_map = CouplingMap.from_spec(coupling_map)
+    app = QuantumApp(job['qubits'], seed=options.get('seed'), verbose=False,
+                     coupling_map=coupling_map)
+    app.compile(job['source'], hardware_optimize=options.get('hardware_optimize', True))
+    result = {'command': job['command'], 'qubits': job['qubits'],
+              'statements': len(app.ast.statements), 'depth': app.layered.depth}
+    if app.routing is not None:
+        result['swaps'] = app.routing['swaps']
+        result['routed_depth'] = app.routing['depth']
+    if job['command'] == 'transpile':
+        result['qasm'] = app.qasm
+    elif job['command'] == 'run':
+        app.run(drop_measured=options.get('drop_measured', False), progress=progress)
+        result['probabilities'] = top_probabilities(app.sim.state, options.get('top_k', 32))
+        result['classical_bits'] = app.sim.classical_bits
+        if options.get('shots'):
+            result['counts'] = sample_counts(app.sim, options['shots'])
+    result['seconds'] = time.perf_counter() - start
+    return result
@@ -33,7 +33,7 @@ def t_ID(t):
         'PI': 'PI',
         # Fixed gates
         'H': 'GATE_FIXED', 'X': 'GATE_FIXED', 'Y': 'GATE_FIXED', 
-        'Z': 'GATE_FIXED', 'CNOT': 'GATE_FIXED','CCNOT': 'GATE_FIXED', 'SWAP': 'GATE_FIXED',
+        'Z': 'GATE_FIXED', 'CNOT': 'GATE_FIXED', 'CZ': 'GATE_FIXED', 'CCNOT': 'GATE_FIXED', 'SWAP': 'GATE_FIXED',
         # Rotational gate  - Rotational/Parameterized gates
         'RX': 'GATE_ROT', 'RY': 'GATE_ROT', 'RZ': 'GATE_ROT', 'CP': 'GATE_ROT'
     }
@@ -54,6 +54,9 @@ def t_INTEGER(t):
 # Ignored characters (whitespace)
 t_ignore = ' \t'
 
+# Line comments: '# ...' and '// ...'
+t_ignore_COMMENT = r'(\#|//)[^\n]*'
+
 def t_newline(t):
     r'\n+'
     t.lexer.lineno += len(t.value)
@@ -66,18 +69,19 @@ def t_error(t):
 lexer = lex.lex()
 
 # Test it out!
-data = '''
-qubit q[2];
-RX(3.14159 / 2.0) q[0];
-CNOT(q[0], q[1]);
-q[0] => c0;
-'''
+if __name__ == "__main__":
+    data = '''
+    qubit q[2];
+    RX(3.14159 / 2.0) q[0];
+    CNOT(q[0], q[1]);
+    q[0] => c0;
+    '''
 
-lexer.input(data)
+    lexer.input(data)
 
-print(f"{'Token Type':<15} | {'Value':<15}")
-print("-" * 35)
-for tok in lexer:
-    print(f"{tok.type:<15} | {tok.value:<15}")
+    print(f"{'Token Type':<15} | {'Value':<15}")
+    print("-" * 35)
+    for tok in lexer:
+        print(f"{tok.type:<15} | {tok.value:<15}")
 
   
@@ -1,4 +1,4 @@
-from AST_Node import GateNode
+from .AST_Node import GateNode
 
 class QuantumLibrary:
     @staticmethod
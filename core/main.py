@@ -1,8 +1,16 @@
-from lexer import lexer
-from parser import parser
-from simulator import QuantumSimulator, run_program, plot_probabilities
-from transpiler import Transpiler
-from decomposer import Decomposer
+from contextlib import nullcontext
+
+from .lexer import lexer
+from .parser import Parser
+from .AST_Node import Program
+from .circuit import Circuit
+from .scheduler import LayerScheduler
+from .simulator import QuantumSimulator
+from .transpiler import Transpiler
+from .decomposer import Decomposer
+from .ascii_plotter import print_ascii_histogram
+
+parser = Parser()
 
 # 1. Your Q-Lite Source Code
 code = """
@@ -15,48 +23,158 @@ q[1] => c1;
 """
 
 class QuantumApp:
-    def __init__(self, num_qubits):
+    def __init__(self, num_qubits, profiler=None, seed=None, verbose=True, prefix_cache=None,
+                 coupling_map=None):
         self.num_qubits = num_qubits
         self.ast = None
-        self.sim = QuantumSimulator(num_qubits)
+        self.circuit = None
+        self.layered = None
+        self.profiler = profiler
+        self.verbose = verbose
+        self.seed = seed
+        self._sim = None
         self.qasm = ""
+        # Optional core.prefix_cache.PrefixCache shared by successive runs
+        self.prefix_cache = prefix_cache
+        # Optional core.routing.CouplingMap the QASM output is routed onto
+        self.coupling_map = coupling_map
+        self.routing = None
+
+    @property
+    def sim(self):
+        """The simulator, created on first use so compile-only work never allocates 2^n amplitudes."""
+        if self._sim is None:
+            self._sim = QuantumSimulator(self.num_qubits, profiler=self.profiler, seed=self.seed)
+        return self._sim
+
+    @sim.setter
+    def sim(self, simulator):
+        self._sim = simulator
+
+    def _log(self, message):
+        if self.verbose:
+            print(message)
+
+    def _stage(self, name, nbytes=0):
+        """Times a pipeline stage, with the bytes it touches, when a profiler is attached."""
+        if self.profiler is None:
+            return nullcontext({'bytes': nbytes})
+        return self.profiler.stage(name, nbytes)
 
-    def compile(self, source_code, hardware_optimize=True):
-        print(f"--- Compiling {self.num_qubits}-Qubit Program ---")
-        # 1. Parse
-        self.ast = parser.parse(source_code, lexer=lexer)
+    def compile(self, source_code, hardware_optimize=True, layering='asap'):
+        self._log(f"--- Compiling {self.num_qubits}-Qubit Program ---")
+        # 1. Lex up front so tokenizing and parsing are timed separately
+        source_bytes = len(source_code.encode("utf-8"))
+        with self._stage('lex', source_bytes):
+            lexer.input(source_code)
+            tokens = list(lexer)
+
+        # 2. Parse
+        with self._stage('parse', source_bytes):
+            stream = iter(tokens)
+            statements = parser.parse(source_code, tokenfunc=lambda: next(stream, None))
+            if statements is None:
+                raise SyntaxError("Could not parse the Q-Lite source.")
+            self.ast = Program(statements)
         
-        # 2. Decompose if needed
+        # 3. Decompose if needed
         if hardware_optimize:
-            dec = Decomposer(self.ast)
-            self.ast = dec.decompose()
+            with self._stage('decompose'):
+                dec = Decomposer(self.ast)
+                self.ast = dec.decompose()
         
-        # 3. Transpile to QASM
-        tp = Transpiler(self.ast)
-        self.qasm = tp.transpile()
-        print("Compilation successful.")
+        # 4. Lower once to the columnar IR shared by the simulator and transpiler
+        with self._stage('lower') as sample:
+            self.circuit = Circuit.lower(self.ast)
+            sample['bytes'] = self.circuit.instructions.nbytes
+
+        # 5. Pack into layers of commuting/disjoint gates (layering=None keeps program order)
+        self.layered = self.circuit
+        if layering:
+            with self._stage('layer', self.circuit.instructions.nbytes):
+                self.layered = LayerScheduler(layering).schedule(self.circuit)
+            report = LayerScheduler.report(self.layered)
+            self._log(f"Depth: {report['depth']}, width: {report['width']} qubits")
+
+        # 6. Transpile to QASM, ordered by layer (and routed onto the coupling map, if any)
+        with self._stage('transpile', self.layered.instructions.nbytes):
+            tp = Transpiler(self.layered, coupling_map=self.coupling_map)
+            self.qasm = tp.transpile()
+        self.routing = tp.routing
+        if self.routing is not None:
+            self._log(f"Routing: {self.routing['swaps']} SWAPs added, "
+                      f"depth {self.routing['depth_before']} -> {self.routing['depth']}")
+        self._log("Compilation successful.")
 
-    def run(self):
+    def run(self, resume_from=None, checkpoint_path=None,
+            checkpoint_every=None, checkpoint_seconds=None, drop_measured=False,
+            progress=None):
         if not self.ast:
             raise Exception("Please compile the program before running.")
         
-        print("Executing on local simulator...")
-        run_program(self.ast, self.sim)
-        print("Execution complete.")
+        start = 0
+        if resume_from is not None:
+            with self._stage('load_checkpoint') as sample:
+                self.sim = QuantumSimulator.load_checkpoint(resume_from, profiler=self.profiler)
+                sample['bytes'] = self.sim.state.nbytes
+            start = self.sim.position
+            self._log(f"Resuming from checkpoint at statement {start}...")
+        elif self._sim is not None and self._sim.position:
+            # A rerun starts over from |0...0> (or a cached prefix) on a fresh register
+            self.sim = None
+
+        # Dropping qubits depends on the whole program, so its prefixes are not reusable
+        cache = self.prefix_cache if resume_from is None and not drop_measured else None
+        # Layering can move an appended gate to the front, so cached runs keep program order
+        circuit = self.circuit if cache is not None else self.layered
+        if resume_from is not None:
+            # Resume in whichever order the checkpoint was saved from; run_program
+            # rejects it if neither matches (an edited program)
+            saved = self.sim.checkpoint_circuit
+            circuit = next((c for c in (self.layered, self.circuit)
+                            if saved in (None, c.fingerprint(start))), self.layered)
+        if cache is not None:
+            with self._stage('prefix_lookup', circuit.instructions.nbytes):
+                # Unseeded measurements must stay random: share nothing past the first one
+                keys = cache.prefix_keys(circuit, salt=(self.num_qubits, self.seed),
+                                         until_measure=self.seed is None)
+                length, snapshot = cache.lookup(keys)
+            if snapshot is not None:
+                fresh = self.sim.rng.bit_generator.state
+                self.sim.restore(snapshot)
+                if self.seed is None:
+                    # Keep this run's own entropy instead of the cached generator state
+                    self.sim.rng.bit_generator.state = fresh
+                start = self.sim.position
+                self._log(f"Reusing cached state for the first {length} of {len(circuit)} operations...")
+            if self.profiler is not None:
+                self.profiler.count('prefix_ops_reused', length)
+            progress = cache.recorder(self.sim, circuit, keys, length, progress)
+
+        self._log("Executing on local simulator...")
+        with self._stage('simulate', self.sim.state.nbytes):
+            self.sim.run_program(circuit, start=start,
+                                 checkpoint_path=checkpoint_path,
+                                 checkpoint_every=checkpoint_every,
+                                 checkpoint_seconds=checkpoint_seconds,
+                                 drop_measured=drop_measured,
+                                 progress=progress,
+                                 sync_every=cache.interval if cache is not None else None)
+        self._log("Execution complete.")
 
     def visualize(self):
-        plot_probabilities(self.sim)
+        print_ascii_histogram(self.sim.state)
 
     def export_qasm(self, filename="output.qasm"):
         with open(filename, "w") as f:
             f.write(self.qasm)
-        print(f"Hardware-ready code exported to {filename}")
+        self._log(f"Hardware-ready code exported to {filename}")
         
 def main():
     print("--- Starting Q-Lite Pipeline ---\n")
     # Parsing phase
     print("[1/6] Parsing code...")
-    ast = parser.parse(code, lexer=lexer)
+    ast = Program(parser.parse(code))
 
      # 1. Decomposition (Preparing for Hardware)
     print("[2/6] Decomposing high-level gates...")
@@ -76,12 +194,12 @@ def main():
     
     # 4. Simulation phase (Local)
     print("[5/6] Running local simulation...")
-    # (Assuming run_program is modified to return the simulator instance)
-    sim = run_program(ast) 
+    sim = QuantumSimulator(2)
+    sim.run_program(optimized_ast)
     
     # 5. Visualization
     print("[6/6] Generating probability distribution...")
-    plot_probabilities(sim)
+    print_ascii_histogram(sim.get_probabilities())
 
 # Inside QuantumApp class in main.py
 
@@ -1,23 +1,8 @@
 import ply.yacc as yacc
 from .lexer import tokens
+from .AST_Node import GateNode, MeasurementNode
 import math
 
-# --- AST Node Classes ---
-class Program:
-    def __init__(self, statements):
-        self.statements = statements
-
-class GateNode:
-    def __init__(self, name, target, angle=None):
-        self.name = name
-        self.target = target
-        self.angle = angle
-
-class MeasurementNode:
-    def __init__(self, target, bit_name):
-        self.target = target
-        self.bit_name = bit_name
-
 # --- Grammar Rules ---
 def p_program(p):
     'program : statement_list'
@@ -39,10 +24,18 @@ def p_statement_fixed_gate(p):
     'statement : GATE_FIXED qarg SEMICOLON'
     p[0] = GateNode(p[1], p[2])
 
+def p_statement_fixed_gate_multi(p):
+    'statement : GATE_FIXED LPAREN qarg_list RPAREN SEMICOLON'
+    p[0] = GateNode(p[1], p[3])
+
 def p_statement_rot_gate(p):
     'statement : GATE_ROT LPAREN expression RPAREN qarg SEMICOLON'
     p[0] = GateNode(p[1], p[5], angle=p[3])
 
+def p_statement_rot_gate_multi(p):
+    'statement : GATE_ROT LPAREN expression RPAREN LPAREN qarg_list RPAREN SEMICOLON'
+    p[0] = GateNode(p[1], p[6], angle=p[3])
+
 def p_statement_measure(p):
     'statement : qarg ARROW ID SEMICOLON'
     p[0] = MeasurementNode(p[1], p[3])
@@ -74,6 +67,15 @@ def p_qarg(p):
     'qarg : ID LBRACKET INTEGER RBRACKET'
     p[0] = f"{p[1]}[{p[3]}]"
 
+def p_qarg_list(p):
+    '''qarg_list : qarg
+                 | qarg_list COMMA qarg'''
+    # Multi-qubit targets keep the "q[0], q[1]" form used by QuantumLibrary
+    if len(p) == 2:
+        p[0] = p[1]
+    else:
+        p[0] = f"{p[1]}, {p[3]}"
+
 def p_error(p):
     if p:
         print(f"Syntax error at '{p.value}'")
@@ -86,8 +88,8 @@ class Parser:
         # Build the yacc parser using the global functions in this module
         self.parser = yacc.yacc()
 
-    def parse(self, data):
-        return self.parser.parse(data)
+    def parse(self, data, **kwargs):
+        return self.parser.parse(data, **kwargs)
 
 
 
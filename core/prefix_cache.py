@@ -0,0 +1,159 @@
+import hashlib
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+from .circuit import MEASURE
+from .simulator import Simulator
+
+# Defaults for in-memory snapshots and their spill directory
+DEFAULT_MEMORY_BUDGET = 256 * 2**20
+DEFAULT_DISK_BUDGET = 2**30
+# Instructions between snapshots taken during a run
+DEFAULT_SNAPSHOT_INTERVAL = 256
+
+
+class PrefixCache:
+    """
+    Bounded store of simulator snapshots keyed by the hash of the circuit
+    prefix that produced them. A rerun of an edited circuit looks up the
+    longest prefix it shares with an earlier run and simulates only the
+    rest.
+
+    Snapshots live in memory up to `memory_budget` bytes, least recently
+    used first out. With `spill_dir`, evicted snapshots are written there
+    as checkpoints (up to `disk_budget` bytes) and memory-mapped back on a
+    hit; snapshots already in the directory are picked up on creation, so
+    the cache survives between processes.
+    """
+    def __init__(self, memory_budget=DEFAULT_MEMORY_BUDGET, spill_dir=None,
+                 disk_budget=DEFAULT_DISK_BUDGET, interval=DEFAULT_SNAPSHOT_INTERVAL):
+        self.memory_budget = memory_budget
+        self.spill_dir = spill_dir
+        self.disk_budget = disk_budget
+        self.interval = interval
+        self.memory = OrderedDict()   # key -> snapshot dict
+        self.disk = OrderedDict()     # key -> bytes on disk
+        self.memory_bytes = 0
+        self.disk_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        if spill_dir is not None:
+            os.makedirs(spill_dir, exist_ok=True)
+            files = [f for f in os.listdir(spill_dir) if f.endswith(".ckpt")]
+            for name in sorted(files, key=lambda f: os.path.getmtime(os.path.join(spill_dir, f))):
+                size = os.path.getsize(os.path.join(spill_dir, name))
+                self.disk[name[:-len(".ckpt")]] = size
+                self.disk_bytes += size
+
+    @staticmethod
+    def prefix_keys(circuit, salt=(), until_measure=False):
+        """
+        Returns len(circuit) + 1 hex keys; key i identifies the first i
+        instructions (plus `salt`, e.g. register size and seed). Each key
+        chains the previous one, so one pass hashes every prefix. With
+        until_measure=True only prefixes before the first MEASURE get a key,
+        so runs with random outcomes never share a measured state.
+        """
+        inst = circuit.instructions
+        if until_measure:
+            measured = np.flatnonzero(inst['op'] == MEASURE)
+            if len(measured):
+                inst = inst[:measured[0]]
+        raw = inst.tobytes()
+        size = inst.dtype.itemsize
+        ops = inst['op'].tolist()
+        matrices = inst['matrix'].tolist()
+        digest = hashlib.blake2b(repr(salt).encode("utf-8"), digest_size=16).digest()
+        keys = [digest.hex()]
+        for i in range(len(inst)):
+            h = hashlib.blake2b(digest, digest_size=16)
+            h.update(raw[i * size:(i + 1) * size])
+            if ops[i] == MEASURE:
+                h.update(circuit.registers[matrices[i]].encode("utf-8"))
+            digest = h.digest()
+            keys.append(digest.hex())
+        return keys
+
+    def lookup(self, keys):
+        """
+        Finds the longest cached prefix among `keys` (as from prefix_keys).
+        Returns (length, snapshot), or (0, None) when nothing matches.
+        """
+        for length in range(len(keys) - 1, 0, -1):
+            key = keys[length]
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                self.hits += 1
+                return length, self.memory[key]
+            if key in self.disk:
+                self.disk.move_to_end(key)
+                self.hits += 1
+                sim = Simulator.load_checkpoint(self._path(key))
+                return length, sim.snapshot(copy=False)
+        self.misses += 1
+        return 0, None
+
+    def put(self, key, snapshot):
+        """Stores a snapshot (taken with copy=True) and evicts down to the budget."""
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            return
+        self.memory[key] = snapshot
+        self.memory_bytes += snapshot['state'].nbytes
+        while self.memory_bytes > self.memory_budget and self.memory:
+            old_key, old = self.memory.popitem(last=False)
+            self.memory_bytes -= old['state'].nbytes
+            self._spill(old_key, old)
+
+    def persist(self):
+        """Writes every in-memory snapshot to the spill directory."""
+        for key, snapshot in self.memory.items():
+            self._spill(key, snapshot)
+
+    def _path(self, key):
+        return os.path.join(self.spill_dir, f"{key}.ckpt")
+
+    def _spill(self, key, snapshot):
+        if self.spill_dir is None or key in self.disk:
+            return
+        if self.disk_budget is not None and snapshot['state'].nbytes > self.disk_budget:
+            return
+        sim = Simulator(0)
+        sim.restore(snapshot, copy=False)
+        sim.save_checkpoint(self._path(key))
+        size = os.path.getsize(self._path(key))
+        self.disk[key] = size
+        self.disk_bytes += size
+        while self.disk_budget is not None and self.disk_bytes > self.disk_budget:
+            old_key, old_size = self.disk.popitem(last=False)
+            self.disk_bytes -= old_size
+            try:
+                os.remove(self._path(old_key))
+            except FileNotFoundError:
+                pass
+
+    def recorder(self, sim, circuit, keys, start=0, progress=None):
+        """
+        Returns a run_program progress callback that snapshots `sim` every
+        `interval` instructions after instruction `start` and at the last
+        prefix `keys` covers, then forwards to `progress`.
+        """
+        stmts = circuit.instructions['stmt'].tolist()
+        state = {'last': start, 'done': start}
+
+        def record(position, total):
+            # Positions only grow, so advance a cursor instead of searching
+            done = state['done']
+            while done < len(stmts) and stmts[done] < position:
+                done += 1
+            state['done'] = done
+            last_key = len(keys) - 1
+            if done <= last_key and done != state['last'] and (
+                    done - state['last'] >= self.interval or position == total or done == last_key):
+                self.put(keys[done], sim.snapshot())
+                state['last'] = done
+            if progress is not None:
+                progress(position, total)
+        return record
@@ -0,0 +1,70 @@
+import json
+import time
+from contextlib import contextmanager
+
+
+class Profiler:
+    """
+    Collects wall time, call counts and bytes touched per pipeline stage
+    and per gate type. Pass one to QuantumApp or Simulator to enable it;
+    with no profiler attached the hot paths skip all bookkeeping.
+    """
+    def __init__(self):
+        self.stages = {}
+        self.gates = {}
+        self.counters = {}
+        self.hooks = []
+
+    def add_hook(self, hook):
+        """
+        Registers a callable invoked as hook(kind, name, seconds, nbytes)
+        for every sample, where kind is 'stage' or 'gate'. Use it to forward
+        numbers into an external metrics pipeline.
+        """
+        self.hooks.append(hook)
+        return hook
+
+    def remove_hook(self, hook):
+        self.hooks.remove(hook)
+
+    @contextmanager
+    def stage(self, name, nbytes=0):
+        """
+        Times the enclosed block and records it under the given stage name.
+        Yields the sample dict; a block that only learns its size inside
+        can set sample['bytes'].
+        """
+        sample = {'bytes': nbytes}
+        start = time.perf_counter()
+        try:
+            yield sample
+        finally:
+            self.record('stage', name, time.perf_counter() - start, sample['bytes'])
+
+    def record(self, kind, name, seconds, nbytes=0):
+        """Adds one sample to the stage or gate table and notifies the hooks."""
+        table = self.gates if kind == 'gate' else self.stages
+        entry = table.get(name)
+        if entry is None:
+            entry = table[name] = {'calls': 0, 'seconds': 0.0, 'bytes': 0}
+        entry['calls'] += 1
+        entry['seconds'] += seconds
+        entry['bytes'] += nbytes
+        for hook in self.hooks:
+            hook(kind, name, seconds, nbytes)
+
+    def count(self, name, value=1):
+        """Adds to a named counter, e.g. bytes of memory traffic avoided."""
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def to_dict(self):
+        return {
+            'stages': {k: dict(v) for k, v in self.stages.items()},
+            'gates': {k: dict(v) for k, v in self.gates.items()},
+            'counters': dict(self.counters),
+        }
+
+    def dump(self, path):
+        """Writes the collected samples to a JSON file."""
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
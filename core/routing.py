@@ -0,0 +1,364 @@
+import heapq
+import json
+import math
+
+import numpy as np
+
+from .circuit import Circuit, INSTRUCTION, MAX_OPERANDS, NO_QUBIT, OP_INDEX
+from .scheduler import LayerScheduler
+
+# Upcoming two-qubit gates scored alongside the blocked front layer
+DEFAULT_LOOKAHEAD = 20
+# Weight of the upcoming gates relative to the front layer
+LOOKAHEAD_WEIGHT = 0.5
+# Each later gate in the lookahead counts this much less than the one before
+LOOKAHEAD_DISCOUNT = 0.7
+# Penalty on recently swapped qubits, so the router does not swap back and forth
+DECAY_STEP = 0.001
+# SWAPs between decay resets (executing gates does not reset it)
+DECAY_RESET = 5
+
+H_OP, CNOT_OP, RZ_OP = OP_INDEX['H'], OP_INDEX['CNOT'], OP_INDEX['RZ']
+SWAP_OP, CCNOT_OP = OP_INDEX['SWAP'], OP_INDEX['CCNOT']
+
+# Toffoli with controls 0, 1 and target 2 in H, CNOT and T / T-dagger gates.
+# T is RZ(pi/4) up to a global phase, so the expansion is exact up to phase.
+_TOFFOLI = (
+    (H_OP, (2,), None), (CNOT_OP, (1, 2), None), (RZ_OP, (2,), -math.pi / 4),
+    (CNOT_OP, (0, 2), None), (RZ_OP, (2,), math.pi / 4), (CNOT_OP, (1, 2), None),
+    (RZ_OP, (2,), -math.pi / 4), (CNOT_OP, (0, 2), None), (RZ_OP, (1,), math.pi / 4),
+    (RZ_OP, (2,), math.pi / 4), (H_OP, (2,), None), (CNOT_OP, (0, 1), None),
+    (RZ_OP, (0,), math.pi / 4), (RZ_OP, (1,), -math.pi / 4), (CNOT_OP, (0, 1), None),
+)
+
+
+class CouplingMap:
+    """
+    Connectivity of a hardware target: physical qubits 0..num_qubits-1 and
+    the pairs that support a two-qubit gate. Edges are undirected; the
+    graph must be connected. `distance[a][b]` is the hop count between
+    two physical qubits.
+    """
+    def __init__(self, num_qubits, edges):
+        self.num_qubits = num_qubits
+        self.edges = sorted({(min(a, b), max(a, b)) for a, b in edges})
+        self.neighbors = [[] for _ in range(num_qubits)]
+        for a, b in self.edges:
+            if a == b or not (0 <= a < num_qubits and 0 <= b < num_qubits):
+                raise ValueError(f"Invalid coupling edge ({a}, {b}) for {num_qubits} qubits.")
+            self.neighbors[a].append(b)
+            self.neighbors[b].append(a)
+        self.distance = [self._bfs(source) for source in range(num_qubits)]
+        if num_qubits and -1 in self.distance[0]:
+            raise ValueError("The coupling map is not connected.")
+        self.diameter = max(max(row) for row in self.distance) if num_qubits else 0
+
+    @classmethod
+    def from_spec(cls, spec):
+        """
+        Builds a map from {"num_qubits": N, "edges": [[a, b], ...]} or a bare
+        edge list (num_qubits then defaults to the highest index + 1).
+        """
+        if isinstance(spec, dict):
+            edges = spec.get('edges')
+            num_qubits = spec.get('num_qubits')
+        else:
+            edges, num_qubits = spec, None
+        if not isinstance(edges, list) or not all(isinstance(e, (list, tuple)) and len(e) == 2
+                                                  for e in edges):
+            raise ValueError("A coupling map needs 'edges' as a list of [a, b] pairs.")
+        edges = [(int(a), int(b)) for a, b in edges]
+        if num_qubits is None:
+            num_qubits = max((max(e) for e in edges), default=-1) + 1
+        return cls(int(num_qubits), edges)
+
+    @classmethod
+    def from_json(cls, path):
+        """Loads a coupling map from a JSON file (see from_spec for the format)."""
+        with open(path, 'r') as f:
+            return cls.from_spec(json.load(f))
+
+    def _bfs(self, source):
+        dist = [-1] * self.num_qubits
+        dist[source] = 0
+        frontier = [source]
+        while frontier:
+            nxt = []
+            for p in frontier:
+                for q in self.neighbors[p]:
+                    if dist[q] < 0:
+                        dist[q] = dist[p] + 1
+                        nxt.append(q)
+            frontier = nxt
+        return dist
+
+
+class _Builder:
+    """Collects (op, qubits, param, matrix) rows and extends the table of a new Circuit."""
+    def __init__(self, circuit):
+        self.table = list(circuit.table)
+        self.index = {key: i for i, key in enumerate(self.table)}
+        self.rows = []
+
+    def gate(self, op, qubits, angle=None):
+        key = (op, angle)
+        matrix = self.index.get(key)
+        if matrix is None:
+            matrix = self.index[key] = len(self.table)
+            self.table.append(key)
+        self.rows.append((op, qubits, np.nan if angle is None else angle, matrix))
+
+    def build(self, circuit, declarations, qubit_registers=None):
+        inst = np.zeros(len(self.rows), dtype=INSTRUCTION)
+        if self.rows:
+            ops, qubits, params, matrices = zip(*self.rows)
+            inst['op'] = ops
+            inst['qubits'] = [tuple(q) + (NO_QUBIT,) * (MAX_OPERANDS - len(q)) for q in qubits]
+            inst['param'] = params
+            inst['matrix'] = matrices
+        inst['stmt'] = np.arange(len(self.rows))
+        return Circuit(inst, self.table, circuit.registers, declarations, len(self.rows),
+                       qubit_registers=qubit_registers)
+
+
+def decompose_toffoli(circuit):
+    """Returns `circuit` with every CCNOT expanded into H, CNOT and RZ(+-pi/4) gates."""
+    if not (circuit.instructions['op'] == CCNOT_OP).any():
+        return circuit
+    out = _Builder(circuit)
+    params = circuit.instructions['param'].tolist()
+    for (op, qubits, matrix, _), param in zip(circuit.rows(), params):
+        if op == CCNOT_OP:
+            for gate, operands, angle in _TOFFOLI:
+                out.gate(gate, [qubits[k] for k in operands], angle)
+        else:
+            out.rows.append((op, qubits, param, matrix))
+    return out.build(circuit, circuit.declarations, circuit.qubit_registers)
+
+
+class Router:
+    """
+    Maps a Circuit onto a CouplingMap. CCNOTs are decomposed first, so every
+    gate acts on at most two qubits. Gates run as soon as their operands
+    are adjacent; when every ready two-qubit gate is blocked, the SWAP on
+    an edge next to them that most reduces the distance of the blocked
+    gates plus the next `lookahead` two-qubit gates is inserted. Program
+    SWAPs only relabel the layout. Each decision looks at a bounded window,
+    so routing time grows with the gate count and the SWAPs added.
+
+    `layout` is 'greedy' (place strongly interacting qubits close
+    together), 'trivial' (logical q -> physical q) or an explicit list.
+    """
+    def __init__(self, coupling_map, lookahead=DEFAULT_LOOKAHEAD, layout='greedy'):
+        if layout not in ('greedy', 'trivial') and not isinstance(layout, (list, tuple)):
+            raise ValueError("'layout' must be 'greedy', 'trivial' or a list of physical qubits.")
+        self.coupling_map = coupling_map
+        self.lookahead = lookahead
+        self.layout = layout
+
+    def route(self, circuit):
+        """
+        Returns (routed circuit on physical qubits, report). The report has
+        'swaps' (SWAPs added), 'depth' before and after routing, and the
+        'initial_layout' / 'final_layout' lists mapping logical to physical
+        qubits.
+        """
+        circuit = decompose_toffoli(circuit)
+        cmap = self.coupling_map
+        dist = cmap.distance
+        rows = list(circuit.rows())
+        params = circuit.instructions['param'].tolist()
+        num_logical = circuit.num_qubits
+        if num_logical > cmap.num_qubits:
+            raise ValueError(f"The circuit uses {num_logical} qubits but the coupling map "
+                             f"has only {cmap.num_qubits}.")
+
+        l2p = self._initial_layout(rows, num_logical)
+        p2l = [-1] * cmap.num_qubits
+        for logical, physical in enumerate(l2p):
+            p2l[physical] = logical
+        initial = list(l2p)
+
+        # Per logical qubit: its instructions in order, and its routed two-qubit gates
+        queues = [[] for _ in range(num_logical)]
+        pairs = [[] for _ in range(num_logical)]
+        for i, (op, qubits, _, _) in enumerate(rows):
+            for q in qubits:
+                queues[q].append(i)
+                if len(qubits) == 2 and op != SWAP_OP:
+                    pairs[q].append(i)
+        head = [0] * num_logical
+        pair_head = [0] * num_logical
+
+        out = _Builder(circuit)
+        state = {'swaps': 0, 'stalled': 0, 'last': None}
+        decay = [1.0] * cmap.num_qubits
+        todo = [queue[0] for queue in queues if queue]
+        heapq.heapify(todo)
+        done = bytearray(len(rows))
+        front = {}   # blocked two-qubit gate -> its logical qubits
+        remaining = len(rows)
+
+        def swap(x, y):
+            out.gate(SWAP_OP, [x, y])
+            lx, ly = p2l[x], p2l[y]
+            p2l[x], p2l[y] = ly, lx
+            if lx >= 0:
+                l2p[lx] = y
+            if ly >= 0:
+                l2p[ly] = x
+            state['swaps'] += 1
+            state['stalled'] += 1
+            state['last'] = (min(x, y), max(x, y))
+            if state['swaps'] % DECAY_RESET == 0:
+                decay[:] = [1.0] * cmap.num_qubits
+            decay[x] += DECAY_STEP
+            decay[y] += DECAY_STEP
+
+        while remaining:
+            while todo:
+                i = heapq.heappop(todo)
+                if done[i] or i in front:
+                    continue
+                op, qubits, matrix, _ = rows[i]
+                if any(queues[q][head[q]] != i for q in qubits):
+                    continue
+                if len(qubits) == 2 and op != SWAP_OP and dist[l2p[qubits[0]]][l2p[qubits[1]]] != 1:
+                    front[i] = qubits
+                    continue
+                if op == SWAP_OP:
+                    a, b = qubits
+                    pa, pb = l2p[a], l2p[b]
+                    l2p[a], l2p[b] = pb, pa
+                    p2l[pa], p2l[pb] = b, a
+                else:
+                    out.rows.append((op, [l2p[q] for q in qubits], params[i], matrix))
+                    if len(qubits) == 2:
+                        for q in qubits:
+                            pair_head[q] += 1
+                done[i] = 1
+                remaining -= 1
+                for q in qubits:
+                    head[q] += 1
+                    if head[q] < len(queues[q]):
+                        heapq.heappush(todo, queues[q][head[q]])
+                state['stalled'] = 0
+            if not remaining:
+                break
+
+            if state['stalled'] > 2 * cmap.diameter + 10:
+                # The heuristic is cycling: walk the oldest blocked gate together
+                a, b = front[min(front)]
+                while dist[l2p[a]][l2p[b]] > 1:
+                    pa, pb = l2p[a], l2p[b]
+                    swap(pa, next(p for p in cmap.neighbors[pa] if dist[p][pb] == dist[pa][pb] - 1))
+            else:
+                swap(*self._best_swap(front, pairs, pair_head, rows, l2p, decay, state['last']))
+            for i, (a, b) in list(front.items()):
+                if dist[l2p[a]][l2p[b]] == 1:
+                    del front[i]
+                    heapq.heappush(todo, i)
+
+        reg = circuit.declarations[0][0] if circuit.declarations else 'q'
+        routed = out.build(circuit, [(reg, cmap.num_qubits)])
+        report = {'swaps': state['swaps'], 'depth_before': self._depth(circuit),
+                  'depth': self._depth(routed), 'initial_layout': initial, 'final_layout': l2p}
+        return routed, report
+
+    def _best_swap(self, front, pairs, pair_head, rows, l2p, decay, last=None):
+        """
+        Scores the SWAPs on edges touching the blocked gates; returns the best
+        edge. `last`, the previous SWAP, is only taken back if nothing else is possible.
+        """
+        cmap = self.coupling_map
+        dist = cmap.distance
+        # The next two-qubit gates on the blocked qubits, nearest first
+        blocked = [q for qubits in front.values() for q in qubits]
+        upcoming, seen, step = [], set(front), 1
+        while len(upcoming) < self.lookahead:
+            added = False
+            for q in blocked:
+                k = pair_head[q] + step
+                if k < len(pairs[q]):
+                    added = True
+                    if pairs[q][k] not in seen:
+                        seen.add(pairs[q][k])
+                        upcoming.append(pairs[q][k])
+            if not added:
+                break
+            step += 1
+        # Program order ranks them by how soon they run
+        upcoming = sorted(upcoming)[:self.lookahead]
+
+        # Physical endpoint -> (weight, other endpoint) for every scored gate
+        ends = {}
+        base = 0.0
+        # Nearer upcoming gates weigh more; together they weigh LOOKAHEAD_WEIGHT
+        discounts = [LOOKAHEAD_DISCOUNT ** rank for rank in range(len(upcoming))]
+        scored = [(qubits, 1.0 / len(front)) for qubits in front.values()]
+        scored += [(rows[i][1], LOOKAHEAD_WEIGHT * w / sum(discounts))
+                   for i, w in zip(upcoming, discounts)]
+        for (a, b), weight in scored:
+            pa, pb = l2p[a], l2p[b]
+            base += weight * dist[pa][pb]
+            ends.setdefault(pa, []).append((weight, pb))
+            ends.setdefault(pb, []).append((weight, pa))
+
+        candidates = sorted({(min(p, n), max(p, n)) for a, b in front.values()
+                             for p in (l2p[a], l2p[b]) for n in cmap.neighbors[p]})
+        if len(candidates) > 1 and last in candidates:
+            candidates.remove(last)
+        best, best_score = None, None
+        for x, y in candidates:
+            delta = 0.0
+            for weight, other in ends.get(x, ()):
+                if other != y:
+                    delta += weight * (dist[y][other] - dist[x][other])
+            for weight, other in ends.get(y, ()):
+                if other != x:
+                    delta += weight * (dist[x][other] - dist[y][other])
+            score = (base + delta) * max(decay[x], decay[y])
+            if best_score is None or score < best_score:
+                best, best_score = (x, y), score
+        return best
+
+    def _initial_layout(self, rows, num_logical):
+        cmap = self.coupling_map
+        if self.layout == 'trivial':
+            return list(range(num_logical))
+        if self.layout != 'greedy':
+            layout = list(self.layout)
+            if len(layout) < num_logical or len(set(layout)) != len(layout) or \
+                    not all(0 <= p < cmap.num_qubits for p in layout):
+                raise ValueError("The layout must give a distinct physical qubit to every logical qubit.")
+            return layout[:num_logical]
+
+        weights = [{} for _ in range(num_logical)]
+        for op, qubits, _, _ in rows:
+            if len(qubits) == 2 and op != SWAP_OP:
+                a, b = qubits
+                weights[a][b] = weights[a].get(b, 0) + 1
+                weights[b][a] = weights[b].get(a, 0) + 1
+        dist = cmap.distance
+        centrality = [sum(row) for row in dist]
+        strength = [sum(w.values()) for w in weights]
+        attached = [0] * num_logical
+        free = set(range(cmap.num_qubits))
+        layout = [None] * num_logical
+        for _ in range(num_logical):
+            # Next: the unplaced qubit most tied to the placed ones, then the busiest
+            logical = max((q for q in range(num_logical) if layout[q] is None),
+                          key=lambda q: (attached[q], strength[q], -q))
+            placed = [(layout[m], w) for m, w in weights[logical].items() if layout[m] is not None]
+            physical = min(free, key=lambda p: (sum(w * dist[p][pm] for pm, w in placed),
+                                                centrality[p], p))
+            layout[logical] = physical
+            free.discard(physical)
+            for m, w in weights[logical].items():
+                attached[m] += w
+        return layout
+
+    @staticmethod
+    def _depth(circuit):
+        layers = LayerScheduler().layers(circuit)
+        return int(layers.max()) + 1 if len(layers) else 0
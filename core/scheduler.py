@@ -0,0 +1,195 @@
+import numpy as np
+
+from .circuit import MEASURE, OPCODES
+
+# Gates whose matrices are diagonal all commute with each other
+DIAGONAL_GATES = {'Z', 'RZ', 'CZ', 'CP'}
+
+# Basis each gate is diagonal in, per operand ('Z', 'X' or None for neither).
+# Two gates commute when every qubit they share has the same non-None basis
+# in both, e.g. CNOTs sharing a control, or an RX on a CNOT target.
+OPERAND_BASES = {
+    'H': (None,), 'Y': (None,), 'RY': (None,),
+    'X': ('X',), 'RX': ('X',),
+    'Z': ('Z',), 'RZ': ('Z',),
+    'CNOT': ('Z', 'X'), 'CCNOT': ('Z', 'Z', 'X'),
+    'CZ': ('Z', 'Z'), 'CP': ('Z', 'Z'),
+    'SWAP': (None, None), 'MEASURE': (None,),
+}
+
+class BlockScheduler:
+    """
+    Plans cache-blocked execution of a run of gates on an n-qubit state.
+
+    Qubit 0 is the most significant bit, so the last `block_qubits` qubits
+    index amplitudes inside one contiguous block of 2**block_qubits entries.
+    Gates touching only those qubits are grouped and later applied block by
+    block, streaming the state through memory once per group instead of once
+    per gate. Gates are pulled forward past earlier gates they commute with
+    (disjoint qubits, or both diagonal), and a frequently used qubit outside
+    the block is swapped with an idle one inside it when that turns future
+    full-state sweeps into block work.
+
+    schedule() returns a list of steps on physical qubit positions:
+        ('block', [(name, qubits, angle), ...])  apply the group per block
+        ('sweep', (name, qubits, angle))         apply one gate to the whole state
+        ('swap', a, b)                           exchange qubits a and b (remap)
+    The layout is restored at the end, so the state leaves in canonical order.
+    """
+    def __init__(self, num_qubits, block_qubits, lookahead=64):
+        self.num_qubits = num_qubits
+        self.block_qubits = block_qubits
+        self.lookahead = lookahead
+        self.first_local = num_qubits - block_qubits
+
+    def schedule(self, ops):
+        layout = list(range(self.num_qubits))   # program qubit -> physical qubit
+        steps = []
+        pending = list(ops)
+        while pending:
+            group, pending = self._take_group(pending, layout)
+            if len(group) > 1:
+                steps.append(('block', [self._place(op, layout) for op in group]))
+                continue
+            if group:
+                steps.append(('sweep', self._place(group[0], layout)))
+                continue
+            swap = self._pick_remap(pending, layout)
+            if swap is not None:
+                steps.append(('swap',) + swap)
+                self._swap_layout(layout, *swap)
+                continue
+            steps.append(('sweep', self._place(pending[0], layout)))
+            pending = pending[1:]
+
+        # Put every qubit back where it started
+        for q in range(self.num_qubits):
+            if layout[q] != q:
+                steps.append(('swap', layout[q], q))
+                self._swap_layout(layout, layout[q], q)
+        return steps
+
+    def _is_local(self, op, layout):
+        return all(layout[q] >= self.first_local for q in op[1])
+
+    def _take_group(self, pending, layout):
+        """
+        Collects the block-local gates in the lookahead window that commute
+        with every earlier gate left behind. Returns (group, remaining).
+        """
+        group, rest = [], []
+        blocked, blocked_diag = set(), set()
+        for i, op in enumerate(pending):
+            if i >= self.lookahead:
+                rest.extend(pending[i:])
+                break
+            qubits = set(op[1])
+            diagonal = op[0].upper() in DIAGONAL_GATES
+            conflict = qubits & blocked or (not diagonal and qubits & blocked_diag)
+            if not conflict and self._is_local(op, layout):
+                group.append(op)
+                continue
+            rest.append(op)
+            (blocked_diag if diagonal else blocked).update(qubits)
+        return group, rest
+
+    def _pick_remap(self, pending, layout):
+        """
+        Chooses a (non-local, local) physical qubit pair to swap when the
+        non-local qubit is used at least twice more than the local one in
+        the lookahead window, otherwise returns None.
+        """
+        if self.first_local <= 0:
+            return None
+        uses = [0] * self.num_qubits
+        for op in pending[:self.lookahead]:
+            for q in op[1]:
+                uses[q] += 1
+        needed = set(pending[0][1])
+        outside = [q for q in needed if layout[q] < self.first_local]
+        inside = [q for q in range(self.num_qubits)
+                  if layout[q] >= self.first_local and q not in needed]
+        if not outside or not inside:
+            return None
+        hot = max(outside, key=lambda q: uses[q])
+        cold = min(inside, key=lambda q: uses[q])
+        if uses[hot] - uses[cold] < 2:
+            return None
+        return layout[hot], layout[cold]
+
+    @staticmethod
+    def _swap_layout(layout, a, b):
+        for q, p in enumerate(layout):
+            if p == a:
+                layout[q] = b
+            elif p == b:
+                layout[q] = a
+
+    @staticmethod
+    def _place(op, layout):
+        name, qubits, angle = op
+        return name, [layout[q] for q in qubits], angle
+
+
+class LayerScheduler:
+    """
+    Packs a Circuit into layers of gates that are pairwise disjoint or
+    commuting (see OPERAND_BASES), so each layer can run in any order or
+    all at once. 'asap' puts every gate in the earliest layer its
+    dependencies allow, 'alap' in the latest. Runs in one pass over the
+    instructions: each qubit remembers only the current run of mutually
+    commuting gates on it and the last layer before that run.
+    """
+    def __init__(self, mode='asap'):
+        if mode not in ('asap', 'alap'):
+            raise ValueError("'mode' must be 'asap' or 'alap'.")
+        self.mode = mode
+
+    def layers(self, circuit):
+        """Returns the layer index of every instruction."""
+        rows = list(circuit.rows())
+        if self.mode == 'alap':
+            asap = self._asap(circuit, rows[::-1])[::-1]
+            return (asap.max() - asap if len(asap) else asap).astype(np.int32)
+        return self._asap(circuit, rows)
+
+    def schedule(self, circuit):
+        """Returns the circuit reordered by layer, with `layers` filled in."""
+        layers = self.layers(circuit)
+        order = np.argsort(layers, kind='stable')
+        return circuit.reorder(order, layers[order])
+
+    @staticmethod
+    def report(circuit):
+        """Depth, width (qubits used) and the largest layer of a layered circuit."""
+        sizes = np.bincount(circuit.layers) if len(circuit) else np.zeros(1, dtype=int)
+        return {'depth': circuit.depth, 'width': circuit.num_qubits,
+                'max_layer_size': int(sizes.max())}
+
+    @staticmethod
+    def _asap(circuit, rows):
+        # Resources are qubits, then one per classical register so writes keep their order
+        resources = circuit.num_qubits + len(circuit.registers)
+        run_basis = [None] * resources
+        run_max = [-1] * resources       # latest layer in the current commuting run
+        before_run = [-1] * resources    # latest layer before that run began
+        layers = np.zeros(len(rows), dtype=np.int32)
+        for i, (op, qubits, matrix, _) in enumerate(rows):
+            operands = list(zip(qubits, OPERAND_BASES[OPCODES[op]]))
+            if op == MEASURE:
+                operands.append((circuit.num_qubits + matrix, None))
+            layer = 0
+            for r, basis in operands:
+                if basis is not None and basis == run_basis[r]:
+                    layer = max(layer, before_run[r] + 1)
+                else:
+                    layer = max(layer, before_run[r] + 1, run_max[r] + 1)
+            for r, basis in operands:
+                if basis is not None and basis == run_basis[r]:
+                    run_max[r] = max(run_max[r], layer)
+                else:
+                    before_run[r] = max(before_run[r], run_max[r])
+                    run_basis[r] = basis
+                    run_max[r] = layer
+            layers[i] = layer
+        return layers
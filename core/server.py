@@ -0,0 +1,255 @@
+import asyncio
+import itertools
+import json
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from . import jobs
+
+# Minimum seconds between progress events sent by a worker for one job
+PROGRESS_INTERVAL = 0.1
+
+
+def default_memory_budget():
+    """Half of physical RAM, or 4 GiB when the platform cannot tell us."""
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') // 2
+    except (AttributeError, ValueError, OSError):
+        return 4 * 2**30
+
+
+# --- Worker Process Side ---
+_progress_queue = None
+
+def _init_worker(progress_queue):
+    global _progress_queue
+    _progress_queue = progress_queue
+
+def _ready():
+    return os.getpid()
+
+def _execute(job_id, job):
+    last = [0.0]
+
+    def report(position, total):
+        now = time.monotonic()
+        if now - last[0] >= PROGRESS_INTERVAL:
+            last[0] = now
+            _progress_queue.put((job_id, position, total))
+
+    return jobs.run_job(job, progress=report)
+
+
+class JobServer:
+    """
+    Local asyncio job server. Jobs are JSON objects
+        {"command": "run" | "compile" | "transpile", "source": "...",
+         "qubits": N, "options": {...}}
+    executed on a bounded pool of warm worker processes. A job is only
+    started once its estimated state-vector memory fits in the remaining
+    memory budget, and deterministic results are cached by job hash.
+
+    HTTP endpoints (TCP or Unix socket):
+        POST /jobs    streams NDJSON events: queued, started, progress,
+                      then result or error
+        GET  /health  returns pool, admission and cache statistics
+    """
+    def __init__(self, workers=None, memory_budget=None, cache_size=256):
+        self.workers = workers or os.cpu_count() or 1
+        self.memory_budget = memory_budget or default_memory_budget()
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.stats = {'submitted': 0, 'cache_hits': 0, 'running': 0,
+                      'waiting': 0, 'failed': 0}
+        self._reserved = 0
+        self._ids = itertools.count(1)
+        self._listeners = {}
+        self._admission = None
+        self._progress = None
+        self._pool = None
+        self._server = None
+        self._pump = None
+
+    async def start(self, host="127.0.0.1", port=8765, unix_path=None):
+        ctx = jobs.mp_context()
+        self._progress = ctx.Queue()
+        self._admission = asyncio.Condition()
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=ctx,
+                                         initializer=_init_worker,
+                                         initargs=(self._progress,))
+        # Start every worker now so no job pays process start-up
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self._pool, _ready)
+                               for _ in range(self.workers)))
+        self._pump = asyncio.ensure_future(self._pump_progress())
+        if unix_path is not None:
+            self._server = await asyncio.start_unix_server(self._handle, path=unix_path)
+        else:
+            self._server = await asyncio.start_server(self._handle, host, port)
+        return self._server
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+        if self._progress is not None:
+            self._progress.put(None)
+            await self._pump
+
+    async def _pump_progress(self):
+        """Forwards (job_id, position, total) tuples from workers to listeners."""
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await loop.run_in_executor(None, self._progress.get)
+            if item is None:
+                return
+            listener = self._listeners.get(item[0])
+            if listener is not None:
+                listener.put_nowait(item)
+
+    async def submit(self, job):
+        """Runs one job and yields its events as dictionaries."""
+        jobs.validate_job(job)
+        job_id = next(self._ids)
+        self.stats['submitted'] += 1
+        key = jobs.job_key(job)
+        cacheable = self.cache_size > 0 and jobs.is_deterministic(job)
+
+        if cacheable and key in self.cache:
+            self.cache.move_to_end(key)
+            self.stats['cache_hits'] += 1
+            yield {'event': 'result', 'job': job_id, 'cached': True, 'result': self.cache[key]}
+            return
+
+        need = jobs.job_memory(job)
+        if need > self.memory_budget:
+            self.stats['failed'] += 1
+            yield {'event': 'error', 'job': job_id,
+                   'message': f"Job needs {need} bytes; the memory budget is {self.memory_budget}."}
+            return
+
+        yield {'event': 'queued', 'job': job_id, 'memory': need}
+        self.stats['waiting'] += 1
+        try:
+            async with self._admission:
+                await self._admission.wait_for(lambda: self._reserved + need <= self.memory_budget)
+                self._reserved += need
+        finally:
+            # A client that disconnects while queued must not stay counted
+            self.stats['waiting'] -= 1
+        self.stats['running'] += 1
+
+        events = asyncio.Queue()
+        self._listeners[job_id] = events
+        future = None
+        try:
+            yield {'event': 'started', 'job': job_id}
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self._pool, _execute, job_id, job)
+            while not future.done():
+                getter = asyncio.ensure_future(events.get())
+                await asyncio.wait({future, getter}, return_when=asyncio.FIRST_COMPLETED)
+                if getter.done():
+                    _, position, total = getter.result()
+                    yield {'event': 'progress', 'job': job_id, 'position': position, 'total': total}
+                else:
+                    getter.cancel()
+            try:
+                result = future.result()
+            except Exception as e:
+                self.stats['failed'] += 1
+                yield {'event': 'error', 'job': job_id, 'message': f"{type(e).__name__}: {e}"}
+                return
+            if cacheable:
+                self.cache[key] = result
+                while len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+            yield {'event': 'result', 'job': job_id, 'cached': False, 'result': result}
+        finally:
+            # If the client went away, keep the memory reserved until the worker is done
+            if future is not None and not future.done():
+                await asyncio.wait({future})
+            del self._listeners[job_id]
+            self.stats['running'] -= 1
+            async with self._admission:
+                self._reserved -= need
+                self._admission.notify_all()
+
+    def health(self):
+        return dict(self.stats, workers=self.workers, memory_budget=self.memory_budget,
+                    memory_reserved=self._reserved, cache_entries=len(self.cache))
+
+    async def _handle(self, reader, writer):
+        try:
+            request_line = await reader.readline()
+            method, path, _ = request_line.decode("latin-1").split(" ", 2)
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+            if method == "GET" and path == "/health":
+                self._respond(writer, "200 OK", self.health())
+            elif method == "POST" and path == "/jobs":
+                try:
+                    job = json.loads(body or b"null")
+                    jobs.validate_job(job)
+                except ValueError as e:
+                    self._respond(writer, "400 Bad Request", {'error': str(e)})
+                else:
+                    await self._stream(writer, self.submit(job))
+            else:
+                self._respond(writer, "404 Not Found", {'error': f"No route for {method} {path}"})
+            await writer.drain()
+        except (ValueError, ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _respond(writer, status, payload):
+        data = json.dumps(payload).encode("utf-8")
+        writer.write(f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+                     f"Content-Length: {len(data)}\r\nConnection: close\r\n\r\n".encode("latin-1"))
+        writer.write(data)
+
+    @staticmethod
+    async def _stream(writer, events):
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\n"
+                     b"Transfer-Encoding: chunked\r\nConnection: close\r\n\r\n")
+        try:
+            async for event in events:
+                data = (json.dumps(event) + "\n").encode("utf-8")
+                writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+                await writer.drain()
+            writer.write(b"0\r\n\r\n")
+        finally:
+            await events.aclose()
+
+
+def serve(host="127.0.0.1", port=8765, unix_path=None, workers=None,
+          memory_budget=None, cache_size=256):
+    """Runs a JobServer until interrupted."""
+    async def main():
+        server = JobServer(workers=workers, memory_budget=memory_budget, cache_size=cache_size)
+        listener = await server.start(host=host, port=port, unix_path=unix_path)
+        where = unix_path or f"http://{host}:{port}"
+        print(f"Q-Lite job server listening on {where} ({server.workers} workers)")
+        try:
+            async with listener:
+                await listener.serve_forever()
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("\nServer stopped.")
@@ -1,5 +1,11 @@
 import numpy as np
-import re
+import json
+import os
+import time
+from collections import deque
+
+from .circuit import Circuit, MEASURE, NO_MATRIX, OPCODES, OP_INDEX, PARAMETERIZED, parse_qubits
+from .scheduler import BlockScheduler
 
 # --- Standard Gate Matrices ---
 I = np.array([[1, 0], [0, 1]], dtype=complex)
@@ -13,107 +19,698 @@ def rx(theta):
     return np.array([[np.cos(theta/2), -1j*np.sin(theta/2)],
                      [-1j*np.sin(theta/2), np.cos(theta/2)]], dtype=complex)
 
+def ry(theta):
+    """Returns the rotation matrix for the Y-axis."""
+    return np.array([[np.cos(theta/2), -np.sin(theta/2)],
+                     [np.sin(theta/2), np.cos(theta/2)]], dtype=complex)
+
+def rz(theta):
+    """Returns the rotation matrix for the Z-axis."""
+    return np.array([[np.exp(-1j*theta/2), 0],
+                     [0, np.exp(1j*theta/2)]], dtype=complex)
+
+def _normalize_pauli_terms(pauli_terms):
+    """Yields (PAULI_STRING, coefficient) pairs from a dict, list or single string."""
+    if isinstance(pauli_terms, str):
+        pauli_terms = [(pauli_terms, 1.0)]
+    elif isinstance(pauli_terms, dict):
+        pauli_terms = pauli_terms.items()
+    for pauli, coeff in pauli_terms:
+        pauli = pauli.upper()
+        if set(pauli) - set('IXYZ'):
+            raise ValueError(f"Invalid Pauli string '{pauli}'.")
+        yield pauli, coeff
+
+def _parity_sum(tensor, parity_axes):
+    """Sums tensor[b] * (-1)^(number of 1 bits of b on parity_axes)."""
+    others = tuple(k for k in range(tensor.ndim) if k not in parity_axes)
+    reduced = tensor.sum(axis=others) if others else tensor
+    # Only parity axes remain: fold them away one bit at a time
+    while reduced.ndim:
+        reduced = reduced[..., 0] - reduced[..., 1]
+    return reduced
+
+# --- Vectorized Kernels ---
+# Each kernel updates a (2,)*k tensor view of the state in place. `axes`
+# are tensor axes; axis 0 is qubit 0, the most significant index bit.
+def _half(t, axis, bit):
+    # The trailing Ellipsis keeps a 0-d view (not a scalar) when t is 1-D
+    return t[(slice(None),) * axis + (bit, Ellipsis)]
+
+def _controlled(t, axes):
+    """Fixes every axis but the last to 1; returns the view and the target axis in it."""
+    index = [slice(None)] * t.ndim
+    for c in axes[:-1]:
+        index[c] = 1
+    target = axes[-1] - sum(c < axes[-1] for c in axes[:-1])
+    return t[tuple(index) + (Ellipsis,)], target
+
+def _kernel_matrix(t, axes, matrix):
+    a0, a1 = _half(t, axes[0], 0), _half(t, axes[0], 1)
+    new0 = matrix[0, 0] * a0 + matrix[0, 1] * a1
+    a1 *= matrix[1, 1]
+    a1 += matrix[1, 0] * a0
+    a0[...] = new0
+
+def _kernel_x(t, axes, _):
+    a0, a1 = _half(t, axes[0], 0), _half(t, axes[0], 1)
+    tmp = a0.copy()
+    a0[...] = a1
+    a1[...] = tmp
+
+def _kernel_diag(t, axes, phases):
+    for bit, phase in enumerate(phases):
+        if phase != 1:
+            view = _half(t, axes[0], bit)
+            view *= phase
+
+def _kernel_controlled_x(t, axes, _):
+    sub, target = _controlled(t, axes)
+    _kernel_x(sub, [target], None)
+
+def _kernel_controlled_phase(t, axes, phase):
+    sub, target = _controlled(t, axes)
+    view = _half(sub, target, 1)
+    view *= phase
+
+def _kernel_swap(t, axes, _):
+    a, b = axes
+    i01, i10 = [slice(None)] * t.ndim, [slice(None)] * t.ndim
+    i01[a], i01[b] = 0, 1
+    i10[a], i10[b] = 1, 0
+    v01, v10 = t[tuple(i01) + (Ellipsis,)], t[tuple(i10) + (Ellipsis,)]
+    tmp = v01.copy()
+    v01[...] = v10
+    v10[...] = tmp
+
+# Widest tensor product applied in one tensordot; 2^4 x 2^4 keeps the
+# per-amplitude work small while cutting passes over memory fourfold
+FUSED_QUBITS = 4
+
+def _kernel_product(t, axes, matrices):
+    """Applies the tensor product of 1-qubit matrices on distinct axes."""
+    out = t
+    for s in range(0, len(axes), FUSED_QUBITS):
+        chunk, factors = axes[s:s + FUSED_QUBITS], matrices[s:s + FUSED_QUBITS]
+        kron = factors[0]
+        for m in factors[1:]:
+            kron = np.kron(kron, m)
+        kron = kron.reshape((2,) * (2 * len(chunk)))
+        out = np.tensordot(kron, out, axes=(list(range(len(chunk), 2 * len(chunk))), chunk))
+        out = np.moveaxis(out, list(range(len(chunk))), chunk)
+    t[...] = out
+
+def _one_qubit_matrix(name, param):
+    """The 2x2 matrix of a 1-qubit gate from its kernel parameter."""
+    if name == 'X':
+        return X
+    if name in ('Z', 'RZ'):
+        return np.diag(np.asarray(param, dtype=complex))
+    return param
+
+def _dagger(param):
+    """Kernel parameter of the inverse gate; every kernel takes its own adjoint."""
+    if param is None:
+        return None
+    if isinstance(param, tuple):
+        return tuple(np.conj(p) for p in param)
+    return np.conj(np.transpose(param))
+
+def _generator_overlap(name, lam, phi, axes):
+    """<lam|G|phi> for the generator G of rotation `name` on tensor `axes`."""
+    if name == 'CP':
+        # CP(theta) = exp(i theta |11><11|)
+        sub_lam, target = _controlled(lam, axes)
+        sub_phi, _ = _controlled(phi, axes)
+        return np.vdot(_half(sub_lam, target, 1), _half(sub_phi, target, 1))
+    l0, l1 = _half(lam, axes[0], 0), _half(lam, axes[0], 1)
+    p0, p1 = _half(phi, axes[0], 0), _half(phi, axes[0], 1)
+    if name == 'RX':
+        return np.vdot(l0, p1) + np.vdot(l1, p0)
+    if name == 'RY':
+        return 1j * (np.vdot(l1, p0) - np.vdot(l0, p1))
+    return np.vdot(l0, p0) - np.vdot(l1, p1)
+
+def _change_frame(t, current, target):
+    """Applies Pauli string `target` after `current` to t in place (P^2 = I, so equal letters cancel)."""
+    for k, (a, b) in enumerate(zip(current, target)):
+        if a != b:
+            for p in (a, b):
+                if p != 'I':
+                    kernel, param = _KERNELS[p]
+                    kernel(t, [k], param(None))
+
+def _apply_observable(psi, terms):
+    """
+    Returns O|psi> for O a sum of (PAULI_STRING, coefficient) terms, built in
+    one result buffer. The buffer holds the sum so far in the frame of the
+    last term P with coefficient c (O|psi> so far = c P result), so moving
+    to the next term only touches the qubits where the strings differ and
+    psi is then added in place; nothing is copied per term.
+    """
+    identity = 'I' * psi.ndim
+    result = np.zeros_like(psi)
+    frame, scale = identity, 1.0
+    for pauli, coeff in terms:
+        if coeff == 0:
+            continue
+        _change_frame(result, frame, pauli)
+        result *= scale / coeff
+        result += psi
+        frame, scale = pauli, coeff
+    _change_frame(result, frame, identity)
+    result *= scale
+    return result
+
+# Gate name -> (kernel, parameter builder taking the angle)
+_KERNELS = {
+    'H':       (_kernel_matrix, lambda angle: H),
+    'X':       (_kernel_x, lambda angle: None),
+    'Y':       (_kernel_matrix, lambda angle: Y),
+    'Z':       (_kernel_diag, lambda angle: (1, -1)),
+    'RX':      (_kernel_matrix, rx),
+    'RY':      (_kernel_matrix, ry),
+    'RZ':      (_kernel_diag, lambda angle: (np.exp(-0.5j*angle), np.exp(0.5j*angle))),
+    'CNOT':    (_kernel_controlled_x, lambda angle: None),
+    'CCNOT':   (_kernel_controlled_x, lambda angle: None),
+    'TOFFOLI': (_kernel_controlled_x, lambda angle: None),
+    'CZ':      (_kernel_controlled_phase, lambda angle: -1),
+    # CP angle k follows the Transpiler convention: theta = 2*pi / 2^k
+    'CP':      (_kernel_controlled_phase, lambda angle: np.exp(2j*np.pi / 2**angle)),
+    'SWAP':    (_kernel_swap, lambda angle: None),
+    # A fused layer of 1-qubit gates; its parameter is the list of matrices
+    'PRODUCT': (_kernel_product, None),
+}
+# Static dispatch table indexed by Circuit opcode
+_DISPATCH = tuple(_KERNELS[name] for name in OPCODES[:MEASURE])
+
+# 2^14 complex128 amplitudes = 256 KiB, sized to stay resident in L2
+DEFAULT_BLOCK_QUBITS = 14
+# Gates handed to the BlockScheduler at a time
+SCHEDULE_WINDOW = 1024
+# Most recent gates kept in Simulator.history for draw()
+DEFAULT_HISTORY_LIMIT = 1024
+
+# --- Checkpoint File Layout ---
+# MAGIC | 8-byte little-endian header length | JSON header | zero padding
+# | raw state buffer. The buffer starts on a CHECKPOINT_ALIGN boundary so it
+# can be memory-mapped straight into a NumPy array.
+CHECKPOINT_MAGIC = b"QLCKPT01"
+CHECKPOINT_ALIGN = 4096
+
 class Simulator:
-    def __init__(self, num_qubits=2):
+    def __init__(self, num_qubits=2, profiler=None, seed=None,
+                 block_qubits=DEFAULT_BLOCK_QUBITS, history_limit=DEFAULT_HISTORY_LIMIT):
         self.num_qubits = num_qubits
         self.state = np.zeros(2**num_qubits, dtype=complex)
         self.state[0] = 1.0
-        self.history = [] 
+        # Last `history_limit` (name, qubits, angle) operations; 0 disables recording
+        self.history = deque(maxlen=history_limit)
+        self.record_history = history_limit != 0
+        # Circuit most recently passed to run_program
+        self.circuit = None
+        # Fingerprint of the statements a loaded checkpoint had already run
+        self.checkpoint_circuit = None
+        # Optional core.profiler.Profiler; None keeps apply_gate free of timing
+        self.profiler = profiler
+        # Index of the next program statement; saved with checkpoints
+        self.position = 0
+        # Program qubit held by each state position (changes when qubits are dropped)
+        self.active_qubits = list(range(num_qubits))
+        # Measurement results by classical register name
+        self.classical_bits = {}
+        self.rng = np.random.default_rng(seed)
+        # run_program schedules gates in cache blocks above this size; None disables
+        self.block_qubits = block_qubits
 
     def get_statevector(self):
         return self.state
 
     def get_probabilities(self):
         """Returns a dictionary mapping bitstrings to probabilities."""
+        start = time.perf_counter() if self.profiler is not None else None
         probs = np.abs(self.state)**2
-        return {
+        result = {
             format(i, f'0{self.num_qubits}b'): float(p) 
             for i, p in enumerate(probs)
         }
+        if start is not None:
+            self.profiler.record('stage', 'get_probabilities',
+                                 time.perf_counter() - start, self.state.nbytes)
+        return result
+
+    def expectation(self, pauli_terms):
+        """
+        Returns <psi|O|psi> for an observable O given as a weighted sum of
+        Pauli strings, e.g. {'ZZI': 0.5, 'XIY': -1.2}, [('ZZI', 0.5)] or a
+        single string. Character k of a string acts on qubit k.
+
+        Terms are grouped by their X/Y flip mask. Each group costs one pass
+        that pairs every amplitude with its bit-flipped partner (a strided
+        view, not a copy); each term in the group then only reduces that
+        product under its Z/Y parity mask.
+        """
+        start = time.perf_counter() if self.profiler is not None else None
+        groups = {}
+        for pauli, coeff in _normalize_pauli_terms(pauli_terms):
+            if len(pauli) != self.num_qubits:
+                raise ValueError(f"Pauli string '{pauli}' does not match {self.num_qubits} qubits.")
+            flip = tuple(k for k, p in enumerate(pauli) if p in 'XY')
+            groups.setdefault(flip, []).append((pauli, coeff))
+
+        psi = np.asarray(self.state).reshape((2,) * self.num_qubits)
+        total = 0j
+        for flip, terms in groups.items():
+            if flip:
+                partner = np.flip(psi, axis=flip)
+                overlap = np.conj(partner) * psi
+            else:
+                overlap = np.abs(psi)**2
+            for pauli, coeff in terms:
+                parity_axes = [k for k, p in enumerate(pauli) if p in 'YZ']
+                phase = 1j ** pauli.count('Y')
+                total += coeff * phase * _parity_sum(overlap, parity_axes)
+
+        if start is not None:
+            self.profiler.record('stage', 'expectation',
+                                 time.perf_counter() - start, self.state.nbytes * len(groups))
+        return float(total.real)
+
+    def gradient(self, program, pauli_terms):
+        """
+        Returns d<O>/d(angle) for every RX, RY, RZ and CP gate of `program`
+        (in program order) as a NumPy array, where O is an observable as
+        accepted by expectation(). CP entries are with respect to its
+        exponent k (theta = 2*pi / 2^k).
+
+        Uses adjoint differentiation: the program runs forward once from the
+        current state, which it is left in, then a backward pass un-applies
+        the gates to two extra state vectors, |phi> and O|psi>, reading off
+        each derivative from their overlap through the gate's generator.
+        """
+        circuit = program if isinstance(program, Circuit) else Circuit.lower(program)
+        if (circuit.instructions['op'] == MEASURE).any():
+            raise ValueError("Gradients need a program without measurements.")
+        terms = list(_normalize_pauli_terms(pauli_terms))
+        for pauli, _ in terms:
+            if len(pauli) != self.num_qubits:
+                raise ValueError(f"Pauli string '{pauli}' does not match {self.num_qubits} qubits.")
+        self.run_program(circuit)
+        start = time.perf_counter() if self.profiler is not None else None
+
+        phi = np.array(self.state).reshape((2,) * self.num_qubits)
+        lam = _apply_observable(phi, terms)
+
+        inverse = [_dagger(_DISPATCH[op][1](angle)) for op, angle in circuit.table]
+        positions = self._position_map()
+        rows = list(circuit.rows())
+        remaining = sum(op in PARAMETERIZED and matrix != NO_MATRIX for op, _, matrix, _ in rows)
+        grad = np.zeros(remaining)
+        for op, qubits, matrix, _ in reversed(rows):
+            if not remaining:
+                break
+            if matrix == NO_MATRIX:
+                continue
+            if positions is not None:
+                qubits = [positions[q] for q in qubits]
+            if op in PARAMETERIZED:
+                remaining -= 1
+                # Each rotation commutes with its generator, so phi may sit after the gate
+                overlap = _generator_overlap(OPCODES[op], lam, phi, qubits)
+                if OPCODES[op] == 'CP':
+                    theta = 2 * np.pi / 2**circuit.table[matrix][1]
+                    grad[remaining] = 2 * np.log(2) * theta * overlap.imag
+                else:
+                    grad[remaining] = overlap.imag
+            kernel = _DISPATCH[op][0]
+            kernel(phi, qubits, inverse[matrix])
+            kernel(lam, qubits, inverse[matrix])
+
+        if start is not None:
+            self.profiler.record('stage', 'gradient', time.perf_counter() - start,
+                                 4 * self.state.nbytes * len(rows))
+        return grad
+
+    def measure(self, qubit, drop=False):
+        """
+        Projectively measures the qubit at state position `qubit`, collapses
+        and renormalizes the state and returns the 0/1 outcome. With
+        drop=True the measured qubit is removed from the state vector,
+        halving its size.
+        """
+        start = time.perf_counter() if self.profiler is not None else None
+        nbytes = self.state.nbytes
+        psi = np.asarray(self.state).reshape((2,) * self.num_qubits)
+        zero = (slice(None),) * qubit + (0,)
+        one = (slice(None),) * qubit + (1,)
+        p1 = float(np.vdot(psi[one], psi[one]).real)
+        outcome = int(self.rng.random() < p1)
+        keep, discard = (one, zero) if outcome else (zero, one)
+        norm = np.sqrt(p1 if outcome else 1.0 - p1)
+
+        if drop:
+            self.state = (psi[keep] / norm).reshape(-1)
+            self.num_qubits -= 1
+            del self.active_qubits[qubit]
+        else:
+            psi[discard] = 0
+            psi[keep] /= norm
+
+        if self.record_history:
+            self.history.append(('MEASURE', [qubit], None))
+        if start is not None:
+            self.profiler.record('gate', 'MEASURE', time.perf_counter() - start, 2 * nbytes)
+        return outcome
 
     def apply_gate(self, gate_name, target_indices, angle=None):
-        """Dispatcher for all gate types using a dictionary mapping."""
+        """Applies one gate through the static opcode dispatch table."""
         if isinstance(target_indices, int):
             target_indices = [target_indices]
+        op = OP_INDEX.get(gate_name.upper())
+        if op is None or op == MEASURE:
+            raise ValueError(f"Gate '{gate_name}' is not supported by QLite.")
+        if self.record_history:
+            self.history.append((OPCODES[op], target_indices, angle))
+        if op in PARAMETERIZED and angle is None:
+            return
+        kernel, param = _DISPATCH[op]
+        self._execute(op, kernel, target_indices, param(angle))
 
-        self.history.append((gate_name, target_indices))
-        
-        # --- Clean Dictionary Dispatcher ---
-        gate_map = {
-            'H':    lambda: self._apply_1q_gate(H, target_indices[0]),
-            'X':    lambda: self._apply_1q_gate(X, target_indices[0]),
-            'Y':    lambda: self._apply_1q_gate(Y, target_indices[0]),
-            'Z':    lambda: self._apply_1q_gate(Z, target_indices[0]),
-            'RX':   lambda: self._apply_1q_gate(rx(angle), target_indices[0]) if angle is not None else None,
-            'CNOT': lambda: self._apply_controlled_gate(X, target_indices[0], target_indices[1]),
-            'CZ':   lambda: self._apply_controlled_gate(Z, target_indices[0], target_indices[1]),
-        }
+    def _execute(self, op, kernel, targets, param):
+        if self.profiler is None:
+            kernel(self._tensor(), targets, param)
+        else:
+            start = time.perf_counter()
+            kernel(self._tensor(), targets, param)
+            # Every kernel reads and rewrites the full state vector once
+            self.profiler.record('gate', OPCODES[op],
+                                 time.perf_counter() - start, 2 * self.state.nbytes)
+
+    def _tensor(self):
+        """Returns the state as a writable (2,)*n view, copying it only if it must."""
+        if not (self.state.flags.c_contiguous and self.state.flags.writeable):
+            self.state = np.array(self.state)
+        return self.state.reshape((2,) * self.num_qubits)
 
-        action = gate_map.get(gate_name.upper())
-        if action:
-            action()
+    def _run_batch(self, ops):
+        """
+        Executes a run of (name, state positions, kernel parameter) gates.
+        Above block_qubits the BlockScheduler groups them so each group is
+        applied one cache-sized block of amplitudes at a time.
+        """
+        if self.block_qubits is None or self.num_qubits <= self.block_qubits:
+            steps = [('sweep', op) for op in ops]
         else:
-            raise ValueError(f"Gate '{gate_name}' is not supported by QLite.")
+            steps = BlockScheduler(self.num_qubits, self.block_qubits).schedule(ops)
 
-    def _apply_1q_gate(self, gate_matrix, target_qubit):
-        """Applies a 1-qubit gate using the Kronecker product."""
-        op = np.array([[1.0]])
-        for i in range(self.num_qubits):
-            if i == target_qubit:
-                op = np.kron(op, gate_matrix)
-            else:
-                op = np.kron(op, I)
-        self.state = np.dot(op, self.state)
-
-    def _apply_controlled_gate(self, matrix, control, target):
-        """Applies a controlled matrix efficiently."""
-        new_state = np.zeros_like(self.state)
-        for i in range(len(self.state)):
-            # Check if control bit is 1
-            if (i >> (self.num_qubits - 1 - control)) & 1:
-                if np.array_equal(matrix, X): # CNOT logic
-                    flipped_idx = i ^ (1 << (self.num_qubits - 1 - target))
-                    new_state[flipped_idx] = self.state[i]
-                elif np.array_equal(matrix, Z): # CZ logic
-                    if (i >> (self.num_qubits - 1 - target)) & 1:
-                        new_state[i] = -self.state[i]
-                    else:
-                        new_state[i] = self.state[i]
+        psi = self._tensor()
+        nbytes = self.state.nbytes
+        for step in steps:
+            start = time.perf_counter() if self.profiler is not None else None
+            if step[0] == 'swap':
+                _kernel_swap(psi, step[1:], None)
+                if start is not None:
+                    # A remap swap rewrites half the amplitudes
+                    self.profiler.record('gate', 'REMAP_SWAP', time.perf_counter() - start, nbytes)
+                    self.profiler.count('remap_bytes', nbytes)
+                continue
+            group = step[1] if step[0] == 'block' else [step[1]]
+            calls = [(_KERNELS[name][0], targets, param) for name, targets, param in group]
+            if step[0] == 'sweep':
+                kernel, targets, param = calls[0]
+                kernel(psi, targets, param)
             else:
-                new_state[i] = self.state[i]
-        self.state = new_state
+                offset = self.num_qubits - self.block_qubits
+                calls = [(kernel, [q - offset for q in targets], param)
+                         for kernel, targets, param in calls]
+                block_shape = (2,) * self.block_qubits
+                for row in self.state.reshape(-1, 2**self.block_qubits):
+                    block = row.reshape(block_shape)
+                    for kernel, targets, param in calls:
+                        kernel(block, targets, param)
+            if start is not None:
+                # The group streams the state once; split the cost across its gates
+                share = (time.perf_counter() - start) / len(group)
+                for name, _, _ in group:
+                    self.profiler.record('gate', name, share, 2 * nbytes // len(group))
+                if len(group) > 1:
+                    self.profiler.count('blocked_groups', 1)
+                    self.profiler.count('blocked_bytes_saved', 2 * nbytes * (len(group) - 1))
 
-    def draw(self):
-        """Prints an ASCII representation of the circuit."""
-        lines = [f"q{i}: ──" for i in range(self.num_qubits)]
-        for gate, targets in self.history:
+    def draw(self, circuit=None):
+        """Prints an ASCII representation of `circuit` (default: the recorded history)."""
+        if circuit is None:
+            circuit = Circuit.from_ops(self.history)
+        lines = [f"q{i}: ──" for i in range(max(self.num_qubits, circuit.num_qubits))]
+        for op, targets, _, _ in circuit.rows():
+            gate = 'M' if op == MEASURE else OPCODES[op]
             if len(targets) == 1:
                 t = targets[0]
-                for i in range(self.num_qubits):
+                for i in range(len(lines)):
                     lines[i] += f"[{gate}]──" if i == t else "─────"
             else:
-                c, t = targets[0], targets[1]
-                for i in range(self.num_qubits):
-                    if i == c: lines[i] += "──●──"
+                t = targets[-1]
+                for i in range(len(lines)):
+                    if i in targets[:-1]: lines[i] += "──●──"
                     elif i == t: lines[i] += f"─[{gate[1] if len(gate)>1 else gate}]─"
                     else: lines[i] += "─────"
         for line in lines:
             print(line)
 
-    def run_program(self, ast_root):
-        """Executes a program from an AST."""
-        statements = ast_root.statements if hasattr(ast_root, 'statements') else ast_root
-        for node in statements:
-            if hasattr(node, 'name'):
-                indices = self.parse_indices(node.target)
-                self.apply_gate(node.name, indices, angle=getattr(node, 'angle', None))
+    def run_program(self, program, start=0, checkpoint_path=None,
+                    checkpoint_every=None, checkpoint_seconds=None,
+                    drop_measured=False, progress=None, sync_every=None):
+        """
+        Executes a Circuit (or an AST, which is lowered first), beginning at
+        statement `start`.
+        When checkpoint_path is given, the state is saved there every
+        `checkpoint_every` operations and/or every `checkpoint_seconds` seconds.
+        Measurements collapse the state and store their outcome in
+        self.classical_bits; with drop_measured=True a measured qubit that no
+        later statement uses is removed from the state vector.
+        `progress`, if given, is called as progress(position, total) whenever
+        the program position advances. Pending gates are flushed at least every
+        `sync_every` operations so that `progress` sees the state at those
+        positions (the prefix cache snapshots there).
+        """
+        circuit = program if isinstance(program, Circuit) else Circuit.lower(program)
+        if start and self.checkpoint_circuit not in (None, circuit.fingerprint(start)):
+            raise ValueError("The checkpoint was saved from a different circuit "
+                             "(the program or its instruction order changed).")
+        self.circuit = circuit
+        total = circuit.num_statements
+        # Kernel parameters are built once per distinct (gate, angle), not per gate
+        params = [_DISPATCH[op][1](angle) for op, angle in circuit.table]
+        autosave = checkpoint_path is not None and (checkpoint_every or checkpoint_seconds)
+        last_use = circuit.last_use() if drop_measured else None
+        positions = self._position_map()
+        first = int(np.searchsorted(circuit.instructions['stmt'], start))
+        record = self.record_history
+        ops_since_save = ops_since_sync = 0
+        last_save = time.monotonic()
+        # A layered circuit has its 1-qubit gates fused per layer into one sweep
+        layers = circuit.layers.tolist()[first:] if circuit.layers is not None else None
+        layer, single = None, []
+        # Above block_qubits, gates are gathered and run through the BlockScheduler
+        batch = [] if self._blocked() or layers is not None else None
+        for i, (op, program_qubits, matrix, pos) in enumerate(circuit.rows(first)):
+            qubits = program_qubits
+            if positions is not None:
+                qubits = [positions[q] for q in program_qubits]
+            if layers is not None and layers[i] != layer:
+                self._fuse(single, batch)
+                layer = layers[i]
+            if op == MEASURE:
+                self._fuse(single, batch)
+                if batch:
+                    self._run_batch(batch)
+                    batch = []
+                if pos > self.position:
+                    # Everything before the measurement has now been applied
+                    self.position = pos
+                    if progress is not None:
+                        progress(pos, total)
+                drop = last_use is not None and last_use[program_qubits[0]] == pos
+                self.classical_bits[circuit.registers[matrix]] = self.measure(qubits[0], drop=drop)
+                if drop:
+                    positions = self._position_map()
+                    if batch is not None and not (self._blocked() or layers is not None):
+                        batch = None
+            else:
+                if record:
+                    # Same (name, qubits, angle) entries as apply_gate records
+                    angle = circuit.table[matrix][1] if matrix != NO_MATRIX else None
+                    self.history.append((OPCODES[op], qubits, angle))
+                if matrix != NO_MATRIX:
+                    if layers is not None and len(qubits) == 1:
+                        single.append((OPCODES[op], qubits, params[matrix]))
+                    elif batch is None:
+                        self._execute(op, _DISPATCH[op][0], qubits, params[matrix])
+                    else:
+                        batch.append((OPCODES[op], qubits, params[matrix]))
+            ops_since_save += 1
+            ops_since_sync += 1
+
+            save_due = autosave and (
+                (checkpoint_every and ops_since_save >= checkpoint_every) or
+                (checkpoint_seconds and time.monotonic() - last_save >= checkpoint_seconds))
+            if batch or single:
+                if len(batch) < SCHEDULE_WINDOW and not save_due and not (
+                        sync_every and ops_since_sync >= sync_every):
+                    continue
+                self._fuse(single, batch)
+                self._run_batch(batch)
+                batch = []
+            ops_since_sync = 0
+            self.position = pos + 1
+            if progress is not None:
+                progress(self.position, total)
+            if save_due:
+                self.save_checkpoint(checkpoint_path)
+                ops_since_save = 0
+                last_save = time.monotonic()
+
+        if single:
+            self._fuse(single, batch)
+        if batch:
+            self._run_batch(batch)
+        if self.position < total:
+            self.position = total
+            if progress is not None:
+                progress(total, total)
+
+    def _fuse(self, single, batch):
+        """
+        Moves the pending 1-qubit gates of one layer into `batch` as a single
+        PRODUCT op (gates sharing a qubit commute, so their matrices are
+        multiplied). Empties `single`.
+        """
+        fused = single
+        if self._blocked():
+            # Gates inside the cache block are already applied in one pass by
+            # the BlockScheduler; only fuse the ones that would each sweep the state
+            first_local = self.num_qubits - self.block_qubits
+            batch.extend(op for op in single if op[1][0] >= first_local)
+            fused = [op for op in single if op[1][0] < first_local]
+        if len(fused) == 1:
+            batch.append(fused[0])
+        elif fused:
+            matrices = {}
+            for name, (q,), param in fused:
+                m = _one_qubit_matrix(name, param)
+                matrices[q] = m @ matrices[q] if q in matrices else m
+            axes = sorted(matrices)
+            batch.append(('PRODUCT', axes, [matrices[q] for q in axes]))
+            if self.profiler is not None:
+                self.profiler.count('fused_gates', len(fused))
+        single.clear()
+
+    def _blocked(self):
+        return self.block_qubits is not None and self.num_qubits > self.block_qubits
+
+    def _position_map(self):
+        """Program qubit -> state position, or None while no qubit has been dropped."""
+        if self.active_qubits == list(range(self.num_qubits)):
+            return None
+        return {q: k for k, q in enumerate(self.active_qubits)}
+
+    def snapshot(self, copy=True):
+        """Captures everything run_program needs to continue from self.position."""
+        return {
+            'state': np.array(self.state) if copy else self.state,
+            'num_qubits': self.num_qubits,
+            'position': self.position,
+            'active_qubits': list(self.active_qubits),
+            'classical_bits': dict(self.classical_bits),
+            'rng': self.rng.bit_generator.state,
+        }
+
+    def restore(self, snapshot, copy=True):
+        """Loads a snapshot() back; the snapshot itself is left untouched when copy=True."""
+        self.state = np.array(snapshot['state']) if copy else snapshot['state']
+        self.num_qubits = snapshot['num_qubits']
+        self.position = snapshot['position']
+        self.active_qubits = list(snapshot['active_qubits'])
+        self.classical_bits = dict(snapshot['classical_bits'])
+        self.rng.bit_generator.state = snapshot['rng']
+
+    def save_checkpoint(self, path):
+        """
+        Writes the raw state vector, the program position and metadata to an
+        uncompressed file that load_checkpoint can memory-map. The file is
+        written next to `path` and renamed into place, so an interrupted save
+        never clobbers the previous checkpoint.
+        """
+        start = time.perf_counter() if self.profiler is not None else None
+        state = np.ascontiguousarray(self.state)
+        header = {
+            'num_qubits': self.num_qubits,
+            'position': self.position,
+            'dtype': state.dtype.str,
+            'length': int(state.shape[0]),
+            'active_qubits': self.active_qubits,
+            'classical_bits': self.classical_bits,
+            'rng': self.rng.bit_generator.state,
+            'circuit': self.circuit.fingerprint(self.position) if self.circuit is not None else None,
+            'created': time.time(),
+        }
+        header_bytes = json.dumps(header).encode("utf-8")
+        prefix = len(CHECKPOINT_MAGIC) + 8 + len(header_bytes)
+        padding = -prefix % CHECKPOINT_ALIGN
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(CHECKPOINT_MAGIC)
+            f.write(len(header_bytes).to_bytes(8, "little"))
+            f.write(header_bytes)
+            f.write(b"\0" * padding)
+            state.tofile(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+        if start is not None:
+            self.profiler.record('stage', 'save_checkpoint',
+                                 time.perf_counter() - start, state.nbytes)
+
+    @classmethod
+    def load_checkpoint(cls, path, mmap=True, profiler=None):
+        """
+        Rebuilds a Simulator from a checkpoint. With mmap=True the state is a
+        copy-on-write memory map of the file: nothing is read up front and
+        the checkpoint on disk is never modified.
+        """
+        with open(path, "rb") as f:
+            if f.read(len(CHECKPOINT_MAGIC)) != CHECKPOINT_MAGIC:
+                raise ValueError(f"'{path}' is not a QLite checkpoint.")
+            header_len = int.from_bytes(f.read(8), "little")
+            header = json.loads(f.read(header_len).decode("utf-8"))
+        prefix = len(CHECKPOINT_MAGIC) + 8 + header_len
+        offset = prefix + (-prefix % CHECKPOINT_ALIGN)
+
+        dtype = np.dtype(header['dtype'])
+        length = header['length']
+        if length != 2**header['num_qubits']:
+            raise ValueError(f"Checkpoint '{path}' has a corrupt state length.")
+
+        # Start from a 1-amplitude register so nothing 2^n-sized is allocated
+        sim = cls(0, profiler=profiler)
+        sim.num_qubits = header['num_qubits']
+        sim.position = header['position']
+        sim.active_qubits = header['active_qubits']
+        sim.classical_bits = header['classical_bits']
+        if 'rng' in header:
+            sim.rng.bit_generator.state = header['rng']
+        sim.checkpoint_circuit = header.get('circuit')
+        if mmap:
+            sim.state = np.memmap(path, dtype=dtype, mode='c', offset=offset, shape=(length,))
+        else:
+            sim.state = np.fromfile(path, dtype=dtype, count=length, offset=offset)
+        return sim
 
     def parse_indices(self, target_str):
         """Extracts numerical indices from string like 'q[0]'."""
-        if not isinstance(target_str, str): 
-            return [target_str] if isinstance(target_str, int) else target_str
-        indices = re.findall(r'\[(\d+)\]', target_str)
-        return [int(i) for i in indices]
+        return parse_qubits(target_str)
 
 # Keep compatibility for testing
 QuantumSimulator = Simulator
@@ -1,56 +1,73 @@
 import math
+from .circuit import Circuit, MEASURE, NO_MATRIX, OPCODES
+from .routing import Router
 
 class Transpiler:
-    def __init__(self, ast_root):
-        self.ast = ast_root
+    def __init__(self, ast_root, coupling_map=None, layout='greedy'):
+        # Reads the same lowered arrays the simulator executes
+        self.circuit = ast_root if isinstance(ast_root, Circuit) else Circuit.lower(ast_root)
         self.output = ["OPENQASM 2.0;", 'include "qelib1.inc";']
+        # Optional core.routing.CouplingMap; None assumes all-to-all connectivity
+        self.coupling_map = coupling_map
+        self.layout = layout
+        # Router report (SWAPs added, depth, layouts) after a routed transpile
+        self.routing = None
 
     def transpile(self):
-        for node in self.ast.statements:
-            # 1. Handle Register Declarations
-            if isinstance(node, tuple) and node[0] == 'DECLARE':
-                self.output.append(f"qreg {node[1]}[{node[2]}];")
-                self.output.append(f"creg c[{node[2]}];")
-            
-            # 2. Handle Gate Applications
-            elif isinstance(node, GateNode):
-                name = node.name.upper()
-                
-                # Controlled Phase (CP) mapping
-                if name == 'CP':
-                    # theta = 2*PI / 2^k
-                    theta = (2 * math.pi) / (2**node.angle)
-                    self.output.append(f"cu1({theta}) {node.target};")
-                
-                # SWAP mapping
-                elif name == 'SWAP':
-                    self.output.append(f"swap {node.target};")
-                
-                # CCNOT (Toffoli) mapping
-                elif name == 'CCNOT' or name == 'TOFFOLI':
-                    self.output.append(f"ccx {node.target};")
-                
-                # CNOT mapping
-                elif name == 'CNOT':
-                    self.output.append(f"cx {node.target};")
-                
-                # Standard single-qubit gates
-                elif name in ['H', 'X', 'Y', 'Z']:
-                    self.output.append(f"{name.lower()} {node.target};")
-                
-                # Generic Rotational Gates (RX, RY, RZ)
-                elif node.angle is not None:
-                    self.output.append(f"{name.lower()}({node.angle}) {node.target};")
-                
-                # Fallback for any other gate names
-                else:
-                    self.output.append(f"{name.lower()} {node.target};")
-            
+        circuit = self.circuit
+        # 0. Route onto the hardware target: qubits become physical qubits
+        if self.coupling_map is not None:
+            circuit, self.routing = Router(self.coupling_map, layout=self.layout).route(circuit)
+            for label in ('initial_layout', 'final_layout'):
+                mapping = ", ".join(f"{l}->{p}" for l, p in enumerate(self.routing[label]))
+                self.output.append(f"// {label.replace('_', ' ')} (logical->physical): {mapping}")
+        # 1. Handle Register Declarations
+        for name, size in circuit.declarations:
+            self.output.append(f"qreg {name}[{size}];")
+            self.output.append(f"creg c[{size}];")
+        reg = circuit.declarations[0][0] if circuit.declarations else 'q'
+        # Global qubit indices back to their register names
+        labels = circuit.qubit_labels(reg)
+
+        # QASM text per (opcode, angle) table entry, built once
+        names = [self._gate(OPCODES[op], angle) for op, angle in circuit.table]
+
+        for op, qubits, matrix, _ in circuit.rows():
+            operands = ", ".join(labels[q] for q in qubits)
             # 3. Handle Measurements
-            elif isinstance(node, MeasurementNode):
-                self.output.append(f"measure {node.qubit} -> {node.classical_reg};")
-        
+            if op == MEASURE:
+                self.output.append(f"measure {operands} -> {circuit.registers[matrix]};")
+            # 2. Handle Gate Applications (a rotation without an angle keeps its bare name)
+            elif matrix == NO_MATRIX:
+                self.output.append(f"{OPCODES[op].lower()} {operands};")
+            else:
+                self.output.append(f"{names[matrix]} {operands};")
+
         return "\n".join(self.output)
 
+    @staticmethod
+    def _gate(name, angle):
+        # Controlled Phase (CP) mapping
+        if name == 'CP':
+            # theta = 2*PI / 2^k
+            theta = (2 * math.pi) / (2**angle)
+            return f"cu1({theta})"
+
+        # SWAP mapping
+        elif name == 'SWAP':
+            return "swap"
+
+        # CCNOT (Toffoli) mapping
+        elif name == 'CCNOT':
+            return "ccx"
+
+        # CNOT mapping
+        elif name == 'CNOT':
+            return "cx"
+
+        # Generic Rotational Gates (RX, RY, RZ)
+        elif angle is not None:
+            return f"{name.lower()}({angle})"
 
-                                              
+        # Standard single-qubit gates and any other gate names
+        return name.lower()
@@ -0,0 +1,23 @@
+from core.AST_Node import GateNode
+
+GATES = ['H', 'X', 'Y', 'Z', 'RX', 'RY', 'RZ', 'CNOT', 'CZ', 'CP', 'SWAP', 'CCNOT']
+ARITY = {'CNOT': 2, 'CZ': 2, 'CP': 2, 'SWAP': 2, 'CCNOT': 3}
+
+def random_program(num_qubits, length, rng, gates=GATES):
+    """
+    Returns `length` random GateNodes from `gates` on q[0..num_qubits-1],
+    drawn with the random.Random `rng`. Rotations get an angle in [0, 6),
+    CP an exponent 1-3.
+    """
+    program = []
+    for _ in range(length):
+        name = rng.choice(gates)
+        qubits = rng.sample(range(num_qubits), ARITY.get(name, 1))
+        if name == 'CP':
+            angle = rng.choice([1, 2, 3])
+        elif name.startswith('R'):
+            angle = rng.uniform(0, 6)
+        else:
+            angle = None
+        program.append(GateNode(name, ", ".join(f"q[{q}]" for q in qubits), angle=angle))
+    return program
@@ -0,0 +1,44 @@
+import io
+import unittest
+import numpy as np
+from core.ascii_plotter import print_ascii_histogram, print_state_vector
+
+def render(*args, **kwargs):
+    out = io.StringIO()
+    print_ascii_histogram(*args, file=out, **kwargs)
+    return out.getvalue()
+
+class TestAsciiPlotter(unittest.TestCase):
+    def test_dict_and_state_vector_agree(self):
+        """Dicts, probability arrays and state vectors all render the same states."""
+        text = render({'00': 0.5, '01': 0.0, '10': 0.0, '11': 0.5})
+        self.assertEqual(text, render(np.array([0.5, 0, 0, 0.5])))
+        state = np.array([1, 0, 0, 1], dtype=complex) / np.sqrt(2)
+        self.assertEqual([l[:5] for l in render(state).splitlines()], [l[:5] for l in text.splitlines()])
+
+    def test_limit_folds_rest_into_other(self):
+        probs = np.full(2**10, 0.5 / (2**10 - 1))
+        probs[3] = 0.5
+        text = render(probs, limit=1)
+        self.assertIn("|0000000011>", text)
+        self.assertIn("other (1023)", text)
+        self.assertIn("50.0%", text.splitlines()[-3])
+
+    def test_bins_and_marginals(self):
+        probs = np.zeros(8)
+        probs[0b110] = probs[0b111] = 0.5
+        text = render(probs, bin_qubits=2, marginals=True)
+        self.assertIn("|11*>", text)
+        self.assertNotIn("|110>", text)
+        rows = {line.split()[0]: line.split()[-1] for line in text.splitlines() if line.startswith("P(")}
+        self.assertEqual(rows, {'P(q0=1)': '100.0%', 'P(q1=1)': '100.0%', 'P(q2=1)': '50.0%'})
+
+    def test_state_vector_limit(self):
+        out = io.StringIO()
+        print_state_vector(np.ones(16) / 4, limit=2, file=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(lines[1], "|0000>: 0.2500")
+        self.assertEqual(lines[-1], "... 14 more nonzero amplitudes")
+
+if __name__ == '__main__':
+    unittest.main()
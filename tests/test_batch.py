@@ -0,0 +1,83 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from core.batch import expand_paths, run_batch
+
+BELL = "qubit q[2]; H q[0]; CNOT(q[0], q[1]);"
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+        os.makedirs(os.path.join(self.dir, "nested"))
+        self.files = {
+            "bell.qlite": BELL,
+            "broken.qlite": "H q[0]",
+            os.path.join("nested", "flip.qlite"): "qubit q[2]; X q[1];",
+        }
+        for name, source in self.files.items():
+            with open(os.path.join(self.dir, name), 'w') as f:
+                f.write(source)
+        with open(os.path.join(self.dir, "notes.txt"), 'w') as f:
+            f.write("not a circuit")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def records(self, command, workers, **kwargs):
+        out = io.StringIO()
+        counts = run_batch(expand_paths([self.dir]), command, 2, workers=workers, out=out, **kwargs)
+        records = {os.path.relpath(r['file'], self.dir): r for r in map(json.loads, out.getvalue().splitlines())}
+        return counts, records
+
+    def test_expand_paths(self):
+        """Directories are searched recursively; globs and plain files are accepted."""
+        self.assertEqual(len(expand_paths([self.dir])), 3)
+        self.assertEqual(expand_paths([os.path.join(self.dir, "*.qlite")]),
+                         [os.path.join(self.dir, "bell.qlite"), os.path.join(self.dir, "broken.qlite")])
+        bell = os.path.join(self.dir, "bell.qlite")
+        self.assertEqual(expand_paths([bell, bell]), [bell])
+
+    def test_failure_does_not_abort_batch(self):
+        (ok, failed), records = self.records('run', 2, options={'shots': 100, 'seed': 7})
+        self.assertEqual((ok, failed), (2, 1))
+        self.assertFalse(records["broken.qlite"]['ok'])
+        self.assertIn("SyntaxError", records["broken.qlite"]['error'])
+        self.assertEqual(set(records["bell.qlite"]['probabilities']), {'00', '11'})
+        self.assertEqual(sum(records["bell.qlite"]['counts'].values()), 100)
+        self.assertEqual(records[os.path.join("nested", "flip.qlite")]['counts'], {'01': 100})
+
+    def test_transpile_writes_qasm(self):
+        out_dir = os.path.join(self.dir, "qasm")
+        (ok, failed), records = self.records('transpile', 1, options={'hardware_optimize': False}, out_dir=out_dir)
+        self.assertEqual((ok, failed), (2, 1))
+        path = records["bell.qlite"]['qasm_path']
+        self.assertEqual(path, os.path.join(out_dir, "bell.qasm"))
+        with open(path) as f:
+            self.assertIn("cx q[0], q[1];", f.read())
+
+    def test_out_dir_mirrors_source_tree(self):
+        """Same-named files in different directories get separate outputs."""
+        with open(os.path.join(self.dir, "nested", "bell.qlite"), 'w') as f:
+            f.write(BELL)
+        out_dir = os.path.join(self.dir, "qasm")
+        (ok, failed), records = self.records('transpile', 2, out_dir=out_dir)
+        self.assertEqual((ok, failed), (3, 1))
+        self.assertEqual(records["bell.qlite"]['qasm_path'], os.path.join(out_dir, "bell.qasm"))
+        self.assertEqual(records[os.path.join("nested", "bell.qlite")]['qasm_path'],
+                         os.path.join(out_dir, "nested", "bell.qasm"))
+
+    def test_output_collision_is_reported(self):
+        """x.ql next to x.qlite would write the same .qasm; the second one fails."""
+        with open(os.path.join(self.dir, "bell.ql"), 'w') as f:
+            f.write(BELL)
+        (ok, failed), records = self.records('transpile', 1)
+        self.assertEqual((ok, failed), (2, 2))
+        self.assertTrue(records["bell.ql"]['ok'])
+        self.assertFalse(records["bell.qlite"]['ok'])
+        self.assertIn("FileExistsError", records["bell.qlite"]['error'])
+
+if __name__ == '__main__':
+    unittest.main()
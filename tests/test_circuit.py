@@ -0,0 +1,101 @@
+import io
+import unittest
+from contextlib import redirect_stdout
+import numpy as np
+from core.AST_Node import GateNode, MeasurementNode
+from core.circuit import Circuit, MEASURE, NO_QUBIT, OP_INDEX
+from core.simulator import Simulator
+from core.transpiler import Transpiler
+
+PROGRAM = [
+    {'type': 'DECLARE', 'id': 'q', 'size': 3},
+    GateNode('H', 'q[0]'),
+    GateNode('RX', 'q[1]', angle=0.5),
+    GateNode('TOFFOLI', 'q[0], q[1], q[2]'),
+    GateNode('RX', 'q[2]', angle=0.5),
+    MeasurementNode('q[2]', 'c2'),
+]
+
+class TestCircuit(unittest.TestCase):
+    def test_lowering(self):
+        circuit = Circuit.lower(PROGRAM)
+        inst = circuit.instructions
+        self.assertEqual(len(circuit), 5)
+        self.assertEqual(circuit.num_statements, 6)
+        self.assertEqual(circuit.declarations, [('q', 3)])
+        self.assertEqual(inst['op'].tolist(), [OP_INDEX['H'], OP_INDEX['RX'], OP_INDEX['CCNOT'],
+                                               OP_INDEX['RX'], MEASURE])
+        self.assertEqual(inst['qubits'][2].tolist(), [0, 1, 2])
+        self.assertEqual(inst['qubits'][0].tolist(), [0, NO_QUBIT, NO_QUBIT])
+        self.assertEqual(inst['stmt'].tolist(), [1, 2, 3, 4, 5])
+        # Both RX(0.5) gates share one table entry
+        self.assertEqual(inst['matrix'][1], inst['matrix'][3])
+        self.assertEqual(len(circuit.table), 3)
+        self.assertEqual(circuit.registers, ['c2'])
+        self.assertEqual(circuit.last_use(), {0: 3, 1: 3, 2: 5})
+
+    def test_unknown_gate(self):
+        with self.assertRaises(ValueError):
+            Circuit.lower([GateNode('FOO', 'q[0]')])
+
+    def test_transpiler_reads_circuit(self):
+        qasm = Transpiler(Circuit.lower(PROGRAM)).transpile()
+        self.assertEqual(qasm.splitlines()[2:], [
+            "qreg q[3];", "creg c[3];", "h q[0];", "rx(0.5) q[1];",
+            "ccx q[0], q[1], q[2];", "rx(0.5) q[2];", "measure q[2] -> c2;"])
+
+    def test_multiple_registers(self):
+        """Each register gets its own qubits, and QASM names them by register."""
+        program = [('DECLARE', 'a', 2), ('DECLARE', 'b', 2), GateNode('H', 'a[0]'),
+                   GateNode('CNOT', 'a[0], b[1]'), MeasurementNode('b[1]', 'c0')]
+        circuit = Circuit.lower(program)
+        self.assertEqual(circuit.qubit_registers, [('a', 0, 2), ('b', 2, 2)])
+        self.assertEqual(circuit.instructions['qubits'][1].tolist(), [0, 3, NO_QUBIT])
+        self.assertEqual(Transpiler(circuit).transpile().splitlines()[-2:],
+                         ["cx a[0], b[1];", "measure b[1] -> c0;"])
+        sim = Simulator(num_qubits=4)
+        sim.run_program(program[:-1])
+        self.assertAlmostEqual(sim.get_probabilities()['1001'], 0.5)
+        with self.assertRaises(ValueError):
+            Circuit.lower([('DECLARE', 'a', 2), GateNode('X', 'a[2]')])
+
+    def test_circuit_matches_ast_execution(self):
+        """Running the lowered circuit equals running the AST gate by gate."""
+        circuit = Circuit.lower(PROGRAM[:-1])
+        from_circuit = Simulator(num_qubits=3)
+        from_circuit.run_program(circuit)
+        by_gate = Simulator(num_qubits=3)
+        for node in PROGRAM[1:-1]:
+            by_gate.apply_gate(node.name, by_gate.parse_indices(node.target), node.angle)
+        np.testing.assert_allclose(from_circuit.state, by_gate.state, atol=1e-12)
+        self.assertEqual(from_circuit.position, 5)
+
+    def test_history_is_bounded(self):
+        sim = Simulator(num_qubits=2, history_limit=3)
+        sim.run_program([GateNode('X', 'q[0]')] * 10)
+        self.assertEqual(len(sim.history), 3)
+        off = Simulator(num_qubits=2, history_limit=0)
+        off.apply_gate('H', [0])
+        self.assertEqual(len(off.history), 0)
+
+    def test_history_keeps_angles(self):
+        """run_program records the same (name, qubits, angle) entries as apply_gate."""
+        sim = Simulator(num_qubits=2)
+        sim.run_program([GateNode('RX', 'q[1]', 0.5), GateNode('CP', 'q[0], q[1]', 2),
+                         GateNode('H', 'q[0]')])
+        self.assertEqual(list(sim.history), [('RX', [1], 0.5), ('CP', [0, 1], 2), ('H', [0], None)])
+        replay = Simulator(num_qubits=2)
+        replay.run_program(Circuit.from_ops(sim.history))
+        np.testing.assert_allclose(replay.state, sim.state, atol=1e-12)
+
+    def test_draw(self):
+        sim = Simulator(num_qubits=2)
+        sim.apply_gate('H', [0])
+        sim.apply_gate('CNOT', [0, 1])
+        out = io.StringIO()
+        with redirect_stdout(out):
+            sim.draw()
+        self.assertEqual(out.getvalue().splitlines(), ["q0: ──[H]────●──", "q1: ────────[N]─"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import multiprocessing
+import random
+import unittest
+from multiprocessing import shared_memory
+from unittest import mock
+import numpy as np
+from core.AST_Node import GateNode, MeasurementNode
+from core.distributed import ShardedSimulator
+from core.simulator import Simulator
+from tests.circuits import random_program
+
+class TestShardedSimulator(unittest.TestCase):
+    def check(self, shards, transport):
+        rng = random.Random(shards)
+        program = random_program(6, 150, rng)
+        reference = Simulator(num_qubits=6)
+        reference.run_program(program)
+        with ShardedSimulator(6, shards, transport) as sim:
+            report = sim.run_program(program)
+            np.testing.assert_allclose(sim.get_statevector(), reference.state, atol=1e-12)
+        self.assertGreater(report['exchanges'], 0)
+        # Each exchange moves half of every shard
+        self.assertEqual(report['exchange_bytes'], report['exchanges'] * 16 * 2**6 // 2)
+
+    def test_shared_memory(self):
+        self.check(2, 'shm')
+        self.check(4, 'shm')
+
+    def test_sockets(self):
+        self.check(4, 'socket')
+
+    def test_global_diagonal_and_control_need_no_exchange(self):
+        """Global qubits only need exchanges when a gate mixes their amplitudes."""
+        with ShardedSimulator(4, 4) as sim:
+            sim.apply_gate('H', [2])
+            sim.apply_gate('H', [3])
+            report = sim.run_program([GateNode('CNOT', 'q[2], q[0]'), GateNode('CNOT', 'q[3], q[0]'),
+                                      GateNode('CZ', 'q[0], q[1]'), GateNode('RZ', 'q[1]', angle=0.4),
+                                      GateNode('SWAP', 'q[1], q[2]')])
+            self.assertEqual(report['exchanges'], 1)
+            state = sim.get_statevector()
+        reference = Simulator(num_qubits=4)
+        for node in [GateNode('H', 'q[2]'), GateNode('H', 'q[3]'), GateNode('CNOT', 'q[2], q[0]'),
+                     GateNode('CNOT', 'q[3], q[0]'), GateNode('CZ', 'q[0], q[1]'),
+                     GateNode('RZ', 'q[1]', angle=0.4), GateNode('SWAP', 'q[1], q[2]')]:
+            reference.apply_gate(node.name, reference.parse_indices(node.target), node.angle)
+        np.testing.assert_allclose(state, reference.state, atol=1e-12)
+
+    def test_measurement(self):
+        """Measuring global and local qubits collapses every shard consistently."""
+        program = [GateNode('H', 'q[0]'), GateNode('CNOT', 'q[0], q[2]'), GateNode('H', 'q[1]'),
+                   MeasurementNode('q[0]', 'c0'), MeasurementNode('q[2]', 'c2'),
+                   MeasurementNode('q[1]', 'c1')]
+        outcomes = set()
+        for seed in range(6):
+            with ShardedSimulator(3, 2, seed=seed) as sim:
+                sim.run_program(program)
+                state = sim.get_statevector()
+            bits = sim.classical_bits
+            self.assertEqual(bits['c0'], bits['c2'])
+            index = int(f"{bits['c0']}{bits['c1']}{bits['c2']}", 2)
+            self.assertAlmostEqual(abs(state[index]), 1.0)
+            outcomes.add((bits['c0'], bits['c1']))
+        self.assertGreater(len(outcomes), 1)
+
+    def test_control_can_leave_for_global_position(self):
+        """With one local qubit, a global CNOT target swaps with the local control."""
+        program = [GateNode('H', 'q[1]'), GateNode('CNOT', 'q[1], q[0]')]
+        with ShardedSimulator(2, 2) as sim:
+            sim.run_program(program)
+            state = sim.get_statevector()
+        reference = Simulator(num_qubits=2)
+        reference.run_program(program)
+        np.testing.assert_allclose(state, reference.state, atol=1e-12)
+
+    def test_expectation(self):
+        rng = random.Random(9)
+        program = random_program(5, 60, rng)
+        reference = Simulator(num_qubits=5)
+        reference.run_program(program)
+        # Several terms share a flip mask, so groups hold more than one term
+        terms = [('XYZIX', 0.3), ('ZIZZI', -1.1), ('IYYXI', 0.7), ('IIIII', 2.0), ('XXIII', 0.5),
+                 ('YXIZX', -0.4), ('IZIIZ', 0.9), ('YYZZI', 0.2), ('IXXYI', -0.6)]
+        with ShardedSimulator(5, 4) as sim:
+            sim.run_program(program)
+            self.assertAlmostEqual(sim.expectation(terms), reference.expectation(terms))
+
+    def test_invalid_shards(self):
+        with self.assertRaises(ValueError):
+            ShardedSimulator(4, 3)
+
+    def test_failed_startup_frees_shared_memory(self):
+        """A worker dying during start-up leaves no processes or segments behind."""
+        created, real = [], shared_memory.SharedMemory
+
+        def segment(**kwargs):
+            created.append(real(**kwargs))
+            return created[-1]
+
+        with mock.patch('core.distributed.jobs.mp_context',
+                        return_value=multiprocessing.get_context('fork')), \
+                mock.patch('core.distributed._worker', side_effect=SystemExit(1)), \
+                mock.patch('core.distributed.shared_memory.SharedMemory', side_effect=segment):
+            with self.assertRaises(EOFError):
+                ShardedSimulator(4, 4)
+        self.assertEqual(len(created), 4)
+        for seg in created:
+            with self.assertRaises(FileNotFoundError):
+                shared_memory.SharedMemory(name=seg.name)
+
+if __name__ == '__main__':
+    unittest.main()
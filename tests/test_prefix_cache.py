@@ -0,0 +1,115 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from core.main import QuantumApp
+from core.prefix_cache import PrefixCache
+from core.profiler import Profiler
+
+BASE = "qubit q[3]; H q[0]; CNOT(q[0], q[1]); RX(0.3) q[2]; CNOT(q[1], q[2]); H q[2];"
+
+def run(source, cache=None, seed=None, profiler=None):
+    app = QuantumApp(3, verbose=False, seed=seed, prefix_cache=cache, profiler=profiler)
+    app.compile(source, hardware_optimize=False)
+    app.run()
+    return app
+
+class TestPrefixCache(unittest.TestCase):
+    def test_prefix_keys(self):
+        a = run(BASE).circuit
+        b = run(BASE + " X q[0];").circuit
+        keys_a, keys_b = PrefixCache.prefix_keys(a), PrefixCache.prefix_keys(b)
+        self.assertEqual(len(keys_a), len(a) + 1)
+        self.assertEqual(keys_a, keys_b[:len(keys_a)])
+        self.assertNotEqual(keys_a, PrefixCache.prefix_keys(a, salt=(4,)))
+
+    def test_edited_tail_resumes_from_prefix(self):
+        cache = PrefixCache(interval=2)
+        app = QuantumApp(3, verbose=False, prefix_cache=cache, profiler=Profiler())
+        app.compile(BASE, hardware_optimize=False)
+        app.run()
+        app.compile(BASE.replace("H q[2];", "Z q[2]; Y q[0];"), hardware_optimize=False)
+        app.run()
+        # The first four operations are shared with the previous run
+        self.assertEqual(app.profiler.counters['prefix_ops_reused'], 4)
+        fresh = run(BASE.replace("H q[2];", "Z q[2]; Y q[0];"))
+        np.testing.assert_allclose(app.sim.state, fresh.sim.state, atol=1e-12)
+
+    def test_measurements_replay_identically(self):
+        source = BASE + " q[0] => c0; H q[1]; q[1] => c1;"
+        cache = PrefixCache(interval=1)
+        first = run(source, cache, seed=3)
+        again = run(source + " X q[2];", cache, seed=3)
+        fresh = run(source + " X q[2];", seed=3)
+        self.assertEqual(again.sim.classical_bits, fresh.sim.classical_bits)
+        np.testing.assert_allclose(again.sim.state, fresh.sim.state, atol=1e-12)
+        self.assertEqual(first.sim.classical_bits, fresh.sim.classical_bits)
+
+    def test_unseeded_measurements_stay_random(self):
+        """Without a seed, cached prefixes end before the first measurement."""
+        cache = PrefixCache(interval=1)
+        source = "qubit q[1]; H q[0]; q[0] => c0; X q[0];"
+        outcomes = {run(source, cache).sim.classical_bits['c0'] for _ in range(40)}
+        self.assertEqual(outcomes, {0, 1})
+        keys = PrefixCache.prefix_keys(run(source).circuit, salt=(3, None), until_measure=True)
+        self.assertEqual(len(keys), 2)
+        self.assertTrue(all(key in cache.memory for key in keys[1:]))
+        self.assertEqual(len(cache.memory), 1)
+
+    def test_idle_qubit_tail_edit_reuses_prefix(self):
+        """Layering would hoist a late gate on an idle qubit; cached runs keep program order."""
+        body = "qubit q[5];" + " H q[0]; CNOT(q[0], q[1]); RX(0.2) q[2]; CNOT(q[2], q[3]);" * 25
+        cache = PrefixCache(interval=4)
+        app = QuantumApp(5, verbose=False, prefix_cache=cache, profiler=Profiler())
+        app.compile(body + " RX(0.3) q[4];", hardware_optimize=False)
+        app.run()
+        app.compile(body + " RX(0.4) q[4];", hardware_optimize=False)
+        app.run()
+        self.assertEqual(app.profiler.counters['prefix_ops_reused'], 100)
+        fresh = QuantumApp(5, verbose=False)
+        fresh.compile(body + " RX(0.4) q[4];", hardware_optimize=False)
+        fresh.run()
+        np.testing.assert_allclose(app.sim.state, fresh.sim.state, atol=1e-12)
+
+    def test_checkpoint_of_cached_run_resumes(self):
+        """A checkpoint saved in program order resumes, also with gates appended."""
+        source = BASE + " X q[1];"
+
+        def interrupt(position, total):
+            if position == 4:
+                raise KeyboardInterrupt
+
+        def resume(path, text):
+            app = QuantumApp(3, verbose=False)
+            app.compile(text, hardware_optimize=False)
+            app.run(resume_from=path)
+            return app
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "run.ckpt")
+            app = QuantumApp(3, verbose=False, prefix_cache=PrefixCache(interval=1))
+            app.compile(source, hardware_optimize=False)
+            with self.assertRaises(KeyboardInterrupt):
+                app.run(checkpoint_path=path, checkpoint_every=2, progress=interrupt)
+            for text in (source, source + " H q[2];"):
+                np.testing.assert_allclose(resume(path, text).sim.state, run(text).sim.state,
+                                           atol=1e-12)
+            with self.assertRaises(ValueError):
+                resume(path, source.replace("CNOT(q[0], q[1])", "CNOT(q[1], q[0])"))
+
+    def test_memory_budget_and_spill(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            # Room for one 3-qubit snapshot in memory; the rest spill to disk
+            cache = PrefixCache(memory_budget=8 * 16, spill_dir=tmp, interval=1)
+            run(BASE, cache)
+            self.assertEqual(len(cache.memory), 1)
+            self.assertEqual(len(os.listdir(tmp)), 4)
+            cache.persist()
+            # A new cache (e.g. a new process) picks the spilled snapshots up
+            reloaded = PrefixCache(memory_budget=0, spill_dir=tmp)
+            app = run(BASE + " X q[1];", reloaded)
+            self.assertEqual(reloaded.hits, 1)
+            np.testing.assert_allclose(app.sim.state, run(BASE + " X q[1];").sim.state, atol=1e-12)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+from core.main import QuantumApp
+from core.profiler import Profiler
+from core.simulator import Simulator
+
+class TestProfiler(unittest.TestCase):
+    def test_gate_samples(self):
+        """Each applied gate is counted under its upper-cased name."""
+        profiler = Profiler()
+        sim = Simulator(num_qubits=2, profiler=profiler)
+        sim.apply_gate("h", [0])
+        sim.apply_gate("CNOT", [0, 1])
+        sim.apply_gate("H", [1])
+
+        self.assertEqual(profiler.gates['H']['calls'], 2)
+        self.assertEqual(profiler.gates['CNOT']['calls'], 1)
+        self.assertEqual(profiler.gates['CNOT']['bytes'], 2 * sim.state.nbytes)
+
+    def test_hooks_and_dump(self):
+        """Hooks see every sample and dump() writes valid JSON."""
+        profiler = Profiler()
+        seen = []
+        profiler.add_hook(lambda kind, name, seconds, nbytes: seen.append((kind, name)))
+        with profiler.stage('parse'):
+            pass
+        sim = Simulator(num_qubits=1, profiler=profiler)
+        sim.apply_gate("X", [0])
+        self.assertEqual(seen, [('stage', 'parse'), ('gate', 'X')])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "profile.json")
+            profiler.dump(path)
+            with open(path) as f:
+                data = json.load(f)
+        self.assertEqual(data['stages']['parse']['calls'], 1)
+        self.assertEqual(data['gates']['X']['calls'], 1)
+
+    def test_stage_bytes(self):
+        """Pipeline stages record the bytes they touch."""
+        profiler = Profiler()
+        app = QuantumApp(2, profiler=profiler, verbose=False)
+        source = "qubit q[2]; H q[0]; CNOT(q[0], q[1]);"
+        app.compile(source, hardware_optimize=False)
+        app.run()
+        stages = profiler.stages
+        self.assertEqual(stages['lex']['bytes'], len(source))
+        self.assertEqual(stages['parse']['bytes'], len(source))
+        for name in ('lower', 'layer', 'transpile'):
+            self.assertEqual(stages[name]['bytes'], app.circuit.instructions.nbytes)
+        self.assertEqual(stages['simulate']['bytes'], app.sim.state.nbytes)
+
+    def test_disabled_by_default(self):
+        """A simulator without a profiler records nothing."""
+        sim = Simulator(num_qubits=1)
+        self.assertIsNone(sim.profiler)
+        with mock.patch.object(Profiler, 'record', side_effect=AssertionError("recorded")):
+            sim.apply_gate("H", [0])
+            app = QuantumApp(1, verbose=False)
+            app.compile("qubit q[1]; X q[0];", hardware_optimize=False)
+            app.run()
+        np.testing.assert_allclose(sim.state, [2**-0.5, 2**-0.5])
+        np.testing.assert_allclose(app.sim.state, [0, 1])
+
+if __name__ == '__main__':
+    unittest.main()
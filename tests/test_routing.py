@@ -0,0 +1,144 @@
+import json
+import os
+import random
+import tempfile
+import unittest
+import numpy as np
+from core.AST_Node import GateNode, MeasurementNode
+from core.circuit import Circuit
+from core.routing import CouplingMap, Router, decompose_toffoli
+from core.simulator import Simulator
+from core.transpiler import Transpiler
+from tests.circuits import random_program
+
+LINE = CouplingMap(5, [(0, 1), (1, 2), (2, 3), (3, 4)])
+GRID = CouplingMap(9, [(0, 1), (1, 2), (3, 4), (4, 5), (6, 7), (7, 8),
+                       (0, 3), (3, 6), (1, 4), (4, 7), (2, 5), (5, 8)])
+
+def simulate(circuit, num_qubits):
+    sim = Simulator(num_qubits=num_qubits, block_qubits=None)
+    sim.run_program(circuit)
+    return sim.state
+
+def embed(state, num_qubits, layout):
+    """Places logical qubit l of `state` on physical qubit layout[l]; spare qubits are |0>."""
+    logical = int(len(state)).bit_length() - 1
+    padded = np.zeros(2**num_qubits, dtype=complex)
+    padded[::2**(num_qubits - logical)] = state
+    order = list(layout) + [p for p in range(num_qubits) if p not in layout]
+    return np.moveaxis(padded.reshape((2,) * num_qubits), list(range(num_qubits)), order).ravel()
+
+class TestCouplingMap(unittest.TestCase):
+    def test_distances(self):
+        self.assertEqual(LINE.distance[0][4], 4)
+        self.assertEqual(GRID.distance[0][8], 4)
+        self.assertEqual(GRID.diameter, 4)
+
+    def test_from_json(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "line.json")
+            with open(path, 'w') as f:
+                json.dump({"num_qubits": 3, "edges": [[0, 1], [1, 2]]}, f)
+            cmap = CouplingMap.from_json(path)
+        self.assertEqual(cmap.edges, [(0, 1), (1, 2)])
+        self.assertEqual(CouplingMap.from_spec([[2, 1], [0, 1]]).num_qubits, 3)
+
+    def test_invalid_maps(self):
+        with self.assertRaises(ValueError):
+            CouplingMap(4, [(0, 1), (2, 3)])
+        with self.assertRaises(ValueError):
+            CouplingMap(2, [(0, 2)])
+        with self.assertRaises(ValueError):
+            CouplingMap.from_spec({"edges": "0-1"})
+
+class TestRouter(unittest.TestCase):
+    def test_toffoli_decomposition(self):
+        """The CCNOT expansion matches CCNOT up to a global phase."""
+        rng = np.random.default_rng(1)
+        state = rng.normal(size=8) + 1j * rng.normal(size=8)
+        state /= np.linalg.norm(state)
+        circuit = Circuit.lower([GateNode('CCNOT', 'q[2], q[0], q[1]')])
+        expanded = decompose_toffoli(circuit)
+        self.assertNotIn(8, expanded.instructions['op'].tolist())
+        results = []
+        for c in (circuit, expanded):
+            sim = Simulator(num_qubits=3)
+            sim.state = state.copy()
+            sim.run_program(c)
+            results.append(sim.state)
+        self.assertAlmostEqual(abs(np.vdot(results[0], results[1])), 1.0)
+
+    def test_routed_circuits_are_equivalent(self):
+        """Every routed 2-qubit gate is on an edge and the final state matches under the final layout."""
+        rng = random.Random(2)
+        for _ in range(30):
+            n = rng.randint(3, 5)
+            circuit = Circuit.lower(random_program(n, rng.randint(1, 40), rng))
+            expected = simulate(circuit, n)
+            for cmap in (LINE, GRID):
+                for layout in ('greedy', 'trivial'):
+                    routed, report = Router(cmap, layout=layout).route(circuit)
+                    for _, qubits, _, _ in routed.rows():
+                        self.assertLessEqual(len(qubits), 2)
+                        if len(qubits) == 2:
+                            self.assertEqual(cmap.distance[qubits[0]][qubits[1]], 1)
+                    state = simulate(routed, cmap.num_qubits)
+                    target = embed(expected, cmap.num_qubits, report['final_layout'])
+                    self.assertAlmostEqual(abs(np.vdot(target, state)), 1.0)
+
+    def test_adjacent_gates_need_no_swaps(self):
+        program = [GateNode('CNOT', 'q[0], q[1]'), GateNode('CNOT', 'q[1], q[2]'),
+                   GateNode('SWAP', 'q[0], q[2]'), MeasurementNode('q[0]', 'c0')]
+        routed, report = Router(LINE, layout='trivial').route(Circuit.lower(program))
+        self.assertEqual(report['swaps'], 0)
+        # A program SWAP only relabels the layout
+        self.assertEqual(report['final_layout'], [2, 1, 0])
+        self.assertEqual(len(routed), 3)
+        self.assertEqual(routed.instructions['qubits'][2][0], 2)
+
+    def test_report(self):
+        program = [GateNode('CNOT', 'q[0], q[4]'), GateNode('H', 'q[2]')]
+        routed, report = Router(LINE, layout='trivial').route(Circuit.lower(program))
+        self.assertEqual(report['swaps'], 3)
+        self.assertEqual(report['initial_layout'], [0, 1, 2, 3, 4])
+        self.assertEqual(report['depth_before'], 1)
+        self.assertEqual(report['depth'], 3)
+
+    def test_greedy_layout_places_partners_together(self):
+        program = [GateNode('CNOT', 'q[0], q[3]')] * 5
+        routed, report = Router(LINE).route(Circuit.lower(program))
+        self.assertEqual(report['swaps'], 0)
+        layout = report['initial_layout']
+        self.assertEqual(abs(layout[0] - layout[3]), 1)
+
+    def test_no_swapping_back_and_forth(self):
+        """The router does not undo its own SWAPs around a decomposed Toffoli."""
+        line = CouplingMap(4, [(0, 1), (1, 2), (2, 3)])
+        circuit = Circuit.lower([GateNode('H', 'q[0]'), GateNode('CCNOT', 'q[0], q[3], q[2]'),
+                                 GateNode('CNOT', 'q[0], q[3]')])
+        expected = simulate(circuit, 4)
+        for layout in ('greedy', 'trivial'):
+            routed, report = Router(line, layout=layout).route(circuit)
+            self.assertLessEqual(report['swaps'], 2)
+            target = embed(expected, 4, report['final_layout'])
+            self.assertAlmostEqual(abs(np.vdot(target, simulate(routed, 4))), 1.0)
+
+    def test_too_many_qubits(self):
+        with self.assertRaises(ValueError):
+            Router(LINE).route(Circuit.lower([GateNode('CNOT', 'q[0], q[5]')]))
+        with self.assertRaises(ValueError):
+            Router(LINE, layout=[0, 0]).route(Circuit.lower([GateNode('CNOT', 'q[0], q[1]')]))
+
+class TestRoutedTranspile(unittest.TestCase):
+    def test_qasm_targets_physical_qubits(self):
+        program = [('DECLARE', 'q', 3), GateNode('CCNOT', 'q[0], q[1], q[2]'),
+                   MeasurementNode('q[2]', 'c0')]
+        tp = Transpiler(program, coupling_map=LINE)
+        qasm = tp.transpile()
+        self.assertIn("qreg q[5];", qasm)
+        self.assertNotIn("ccx", qasm)
+        self.assertIn("// initial layout", qasm)
+        self.assertIsNotNone(tp.routing)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import random
+import unittest
+import numpy as np
+from core.AST_Node import GateNode, MeasurementNode
+from core.profiler import Profiler
+from core.circuit import Circuit
+from core.scheduler import BlockScheduler, LayerScheduler
+from core.simulator import Simulator
+from tests.circuits import random_program
+
+class TestBlockScheduler(unittest.TestCase):
+    def test_groups_local_gates(self):
+        """Gates inside the block are grouped; others become sweeps."""
+        ops = [('H', [3], None), ('X', [2], None), ('H', [0], None), ('Z', [3], None)]
+        steps = BlockScheduler(4, 2).schedule(ops)
+        self.assertEqual(steps[0], ('block', [('H', [3], None), ('X', [2], None), ('Z', [3], None)]))
+        self.assertEqual(steps[1], ('sweep', ('H', [0], None)))
+
+    def test_respects_dependencies(self):
+        """A local gate is never hoisted past a non-commuting gate on its qubit."""
+        ops = [('H', [3], None), ('CNOT', [0, 3], None), ('H', [3], None)]
+        steps = BlockScheduler(4, 2, lookahead=8).schedule(ops)
+        names = [step[1][0] for step in steps if step[0] == 'sweep']
+        self.assertEqual(names, ['H', 'CNOT', 'H'])
+
+    def test_diagonal_gates_commute(self):
+        """Diagonal gates sharing a qubit may still be reordered."""
+        ops = [('Z', [3], None), ('CZ', [0, 3], None), ('RZ', [3], 0.5)]
+        steps = BlockScheduler(4, 2).schedule(ops)
+        self.assertEqual(steps[0], ('block', [('Z', [3], None), ('RZ', [3], 0.5)]))
+
+    def test_remap_restores_layout(self):
+        """Hot qubits outside the block are swapped in and put back at the end."""
+        ops = [('H', [0], None), ('X', [0], None), ('H', [0], None), ('Y', [0], None)]
+        steps = BlockScheduler(4, 2).schedule(ops)
+        self.assertEqual(steps[0][0], 'swap')
+        self.assertEqual(steps[1][0], 'block')
+        self.assertEqual(steps[-1][0], 'swap')
+
+class TestBlockedExecution(unittest.TestCase):
+    def test_matches_unblocked(self):
+        """Cache-blocked execution reproduces gate-by-gate simulation."""
+        rng = random.Random(5)
+        for _ in range(40):
+            n = rng.randint(3, 7)
+            program = random_program(n, rng.randint(1, 60), rng)
+            plain = Simulator(num_qubits=n, block_qubits=None)
+            plain.run_program(program)
+            blocked = Simulator(num_qubits=n, block_qubits=rng.randint(1, n - 1))
+            blocked.run_program(program)
+            np.testing.assert_allclose(blocked.state, plain.state, atol=1e-12)
+            self.assertEqual(len(blocked.history), len(program))
+
+    def test_profiler_reports_savings(self):
+        profiler = Profiler()
+        sim = Simulator(num_qubits=4, block_qubits=2, profiler=profiler)
+        sim.run_program([GateNode('H', 'q[3]'), GateNode('H', 'q[2]'), GateNode('X', 'q[3]')])
+        self.assertEqual(profiler.counters['blocked_groups'], 1)
+        self.assertEqual(profiler.counters['blocked_bytes_saved'], 2 * 2 * sim.state.nbytes)
+        self.assertEqual(profiler.gates['H']['calls'], 2)
+
+class TestLayerScheduler(unittest.TestCase):
+    def test_asap_and_alap_layers(self):
+        circuit = Circuit.lower([GateNode('H', 'q[0]'), GateNode('H', 'q[1]'),
+                                 GateNode('CNOT', 'q[0], q[1]'), GateNode('X', 'q[2]')])
+        self.assertEqual(LayerScheduler('asap').layers(circuit).tolist(), [0, 0, 1, 0])
+        self.assertEqual(LayerScheduler('alap').layers(circuit).tolist(), [0, 0, 1, 1])
+
+    def test_commuting_gates_share_a_layer(self):
+        """CNOTs sharing a control (or a target) commute and are packed together."""
+        circuit = Circuit.lower([GateNode('CNOT', 'q[0], q[1]'), GateNode('CNOT', 'q[0], q[2]'),
+                                 GateNode('RZ', 'q[0]', 0.3), GateNode('H', 'q[0]')])
+        self.assertEqual(LayerScheduler().layers(circuit).tolist(), [0, 0, 0, 1])
+
+    def test_measurements_keep_register_order(self):
+        circuit = Circuit.lower([MeasurementNode('q[0]', 'c'), MeasurementNode('q[1]', 'c'),
+                                 MeasurementNode('q[2]', 'd')])
+        self.assertEqual(LayerScheduler().layers(circuit).tolist(), [0, 1, 0])
+
+    def test_schedule_and_report(self):
+        circuit = Circuit.lower([GateNode('H', 'q[0]'), GateNode('CNOT', 'q[0], q[1]'),
+                                 GateNode('H', 'q[2]')])
+        layered = LayerScheduler().schedule(circuit)
+        self.assertEqual(layered.instructions['stmt'].tolist(), [0, 1, 2])
+        self.assertEqual(layered.instructions['qubits'][:, 0].tolist(), [0, 2, 0])
+        self.assertEqual(LayerScheduler.report(layered),
+                         {'depth': 2, 'width': 3, 'max_layer_size': 2})
+
+    def test_layered_execution_matches_program_order(self):
+        rng = random.Random(11)
+        for _ in range(30):
+            n = rng.randint(3, 7)
+            circuit = Circuit.lower(random_program(n, rng.randint(1, 60), rng))
+            plain = Simulator(num_qubits=n, block_qubits=None)
+            plain.run_program(circuit)
+            for mode in ('asap', 'alap'):
+                layered = LayerScheduler(mode).schedule(circuit)
+                for block_qubits in (None, rng.randint(1, n - 1)):
+                    sim = Simulator(num_qubits=n, block_qubits=block_qubits)
+                    sim.run_program(layered)
+                    np.testing.assert_allclose(sim.state, plain.state, atol=1e-12)
+
+    def test_profiler_counts_fused_gates(self):
+        profiler = Profiler()
+        sim = Simulator(num_qubits=3, block_qubits=None, profiler=profiler)
+        program = [GateNode('H', 'q[0]'), GateNode('RX', 'q[1]', 0.4), GateNode('X', 'q[2]')]
+        sim.run_program(LayerScheduler().schedule(Circuit.lower(program)))
+        self.assertEqual(profiler.counters['fused_gates'], 3)
+        expected = Simulator(num_qubits=3)
+        expected.run_program(program)
+        np.testing.assert_allclose(sim.state, expected.state, atol=1e-12)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import asyncio
+import json
+import unittest
+from core import jobs
+from core.server import JobServer
+
+BELL = "qubit q[2]; H q[0]; CNOT(q[0], q[1]);"
+
+class TestJobServer(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.server = JobServer(workers=1, memory_budget=2**20, cache_size=4)
+        listener = await self.server.start(host="127.0.0.1", port=0)
+        self.port = listener.sockets[0].getsockname()[1]
+
+    async def asyncTearDown(self):
+        await self.server.close()
+
+    async def request(self, method, path, payload=None):
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        body = json.dumps(payload).encode() if payload is not None else b""
+        writer.write(f"{method} {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+        await writer.drain()
+        raw = await asyncio.wait_for(reader.read(), 30)
+        writer.close()
+        head, _, body = raw.partition(b"\r\n\r\n")
+        return head.decode(), body
+
+    @staticmethod
+    def events(body):
+        """Decodes a chunked NDJSON body into a list of events."""
+        events = []
+        while body:
+            size, _, rest = body.partition(b"\r\n")
+            size = int(size, 16)
+            if size == 0:
+                break
+            events.extend(json.loads(line) for line in rest[:size].splitlines())
+            body = rest[size + 2:]
+        return events
+
+    async def test_run_and_cache(self):
+        """A repeated job is answered from the result cache."""
+        job = {'command': 'run', 'source': BELL, 'qubits': 2}
+        head, body = await self.request("POST", "/jobs", job)
+        self.assertIn("200 OK", head)
+        events = self.events(body)
+        self.assertEqual([e['event'] for e in events][:2], ['queued', 'started'])
+        result = events[-1]
+        self.assertEqual(result['event'], 'result')
+        self.assertFalse(result['cached'])
+        self.assertEqual(set(result['result']['probabilities']), {'00', '11'})
+
+        _, body = await self.request("POST", "/jobs", job)
+        self.assertTrue(self.events(body)[-1]['cached'])
+        self.assertEqual(self.server.health()['cache_hits'], 1)
+
+    async def test_transpile(self):
+        job = {'command': 'transpile', 'source': BELL, 'qubits': 2,
+               'options': {'hardware_optimize': False}}
+        _, body = await self.request("POST", "/jobs", job)
+        self.assertIn("cx q[0], q[1];", self.events(body)[-1]['result']['qasm'])
+
+    async def test_abandoned_wait_is_not_counted(self):
+        """A job cancelled while waiting for memory leaves the waiting count."""
+        self.server._reserved = self.server.memory_budget
+        submission = self.server.submit({'command': 'run', 'source': BELL, 'qubits': 2})
+        self.assertEqual((await submission.__anext__())['event'], 'queued')
+        waiting = asyncio.ensure_future(submission.__anext__())
+        await asyncio.sleep(0.05)
+        self.assertEqual(self.server.stats['waiting'], 1)
+        waiting.cancel()
+        await asyncio.gather(waiting, return_exceptions=True)
+        self.assertEqual(self.server.stats['waiting'], 0)
+        self.server._reserved = 0
+
+    async def test_transpile_jobs_do_not_allocate(self):
+        """Admission counts 0 bytes for transpile jobs, so they must never build a state."""
+        job = {'command': 'transpile', 'source': BELL, 'qubits': 60}
+        self.assertEqual(jobs.job_memory(job), 0)
+        self.assertIn("cx", jobs.run_job(job)['qasm'])
+
+    async def test_errors(self):
+        """Bad requests get a 400; syntax errors and oversized jobs get error events."""
+        head, _ = await self.request("POST", "/jobs", {'command': 'explode'})
+        self.assertIn("400", head)
+
+        _, body = await self.request("POST", "/jobs", {'command': 'run', 'source': 'H q[0]', 'qubits': 1})
+        self.assertEqual(self.events(body)[-1]['event'], 'error')
+
+        _, body = await self.request("POST", "/jobs", {'command': 'run', 'source': BELL, 'qubits': 20})
+        self.assertIn("memory budget", self.events(body)[-1]['message'])
+
+    async def test_health(self):
+        head, body = await self.request("GET", "/health")
+        self.assertIn("200 OK", head)
+        self.assertEqual(json.loads(body)['workers'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,11 @@
+import os
+import random
+import tempfile
 import unittest
 import numpy as np
-from core.simulator import Simulator
+from core.AST_Node import GateNode, MeasurementNode
+from core.simulator import Simulator, I, X, Y, Z, _apply_observable
+from tests.circuits import random_program
 
 class TestSimulator(unittest.TestCase):
     def setUp(self):
@@ -55,6 +60,199 @@ class TestSimulator(unittest.TestCase):
         self.assertIn('00', probs)
         self.assertEqual(len(probs), 4)
 
+class TestExpectation(unittest.TestCase):
+    def test_bell_state_correlations(self):
+        """A Bell state has <ZZ> = <XX> = 1, <YY> = -1 and <ZI> = 0."""
+        sim = Simulator(num_qubits=2)
+        sim.apply_gate("H", [0])
+        sim.apply_gate("CNOT", [0, 1])
+        self.assertAlmostEqual(sim.expectation('ZZ'), 1.0)
+        self.assertAlmostEqual(sim.expectation('XX'), 1.0)
+        self.assertAlmostEqual(sim.expectation('YY'), -1.0)
+        self.assertAlmostEqual(sim.expectation('ZI'), 0.0)
+        self.assertAlmostEqual(sim.expectation({'ZZ': 0.5, 'YY': 2.0}), -1.5)
+
+    def test_matches_dense_operator(self):
+        """Weighted Pauli sums agree with the explicit Kronecker operator."""
+        rng = np.random.default_rng(7)
+        sim = Simulator(num_qubits=3)
+        state = rng.normal(size=8) + 1j * rng.normal(size=8)
+        sim.state = state / np.linalg.norm(state)
+
+        paulis = {'I': I, 'X': X, 'Y': Y, 'Z': Z}
+        terms = [('XYZ', 0.3), ('ZIZ', -1.1), ('XYI', 0.7), ('IYY', 0.25), ('III', 2.0)]
+        expected = 0.0
+        for pauli, coeff in terms:
+            op = np.array([[1.0]])
+            for p in pauli:
+                op = np.kron(op, paulis[p])
+            expected += coeff * np.vdot(sim.state, op @ sim.state).real
+        self.assertAlmostEqual(sim.expectation(terms), expected)
+
+    def test_invalid_terms(self):
+        sim = Simulator(num_qubits=2)
+        with self.assertRaises(ValueError):
+            sim.expectation('ZZZ')
+        with self.assertRaises(ValueError):
+            sim.expectation('ZA')
+
+class TestGradient(unittest.TestCase):
+    def test_matches_finite_differences(self):
+        """Adjoint gradients agree with central differences for every angle."""
+        program = random_program(4, 40, random.Random(3))
+        observable = {'ZZII': 0.7, 'XIYI': -0.4, 'IIIZ': 1.0, 'YXZI': 0.3}
+
+        sim = Simulator(num_qubits=4)
+        grad = sim.gradient(program, observable)
+        parameterized = [node for node in program if node.angle is not None]
+        self.assertEqual(grad.shape, (len(parameterized),))
+
+        eps = 1e-6
+        for node, value in zip(parameterized, grad):
+            angle = node.angle
+            shifted = []
+            for delta in (eps, -eps):
+                node.angle = angle + delta
+                probe = Simulator(num_qubits=4)
+                probe.run_program(program)
+                shifted.append(probe.expectation(observable))
+            node.angle = angle
+            self.assertAlmostEqual(value, (shifted[0] - shifted[1]) / (2 * eps), places=6)
+
+        # The simulator is left in the program's output state
+        expected = Simulator(num_qubits=4)
+        expected.run_program(program)
+        np.testing.assert_allclose(sim.state, expected.state, atol=1e-12)
+
+    def test_single_rotation(self):
+        """<Z> after RX(t) is cos(t), so the gradient is -sin(t)."""
+        sim = Simulator(num_qubits=1)
+        grad = sim.gradient([GateNode('RX', 'q[0]', 0.4)], 'Z')
+        np.testing.assert_allclose(grad, [-np.sin(0.4)])
+
+    def test_observable_matches_dense_operator(self):
+        """O|psi> built in one buffer equals the explicit Kronecker operator."""
+        rng = np.random.default_rng(5)
+        psi = rng.normal(size=8) + 1j * rng.normal(size=8)
+        paulis = {'I': I, 'X': X, 'Y': Y, 'Z': Z}
+        terms = [('XYZ', 0.3), ('ZIZ', -1.1), ('III', 2.0), ('IXI', 0.0), ('YYY', 1e-4)]
+        expected = np.zeros(8, dtype=complex)
+        for pauli, coeff in terms:
+            op = np.array([[1.0]])
+            for p in pauli:
+                op = np.kron(op, paulis[p])
+            expected += coeff * (op @ psi)
+        tensor = psi.reshape((2,) * 3).copy()
+        np.testing.assert_allclose(_apply_observable(tensor, terms).ravel(), expected, atol=1e-12)
+        np.testing.assert_array_equal(tensor.ravel(), psi)
+
+    def test_rejects_measurements(self):
+        sim = Simulator(num_qubits=2)
+        with self.assertRaises(ValueError):
+            sim.gradient([GateNode('RX', 'q[0]', 0.4), MeasurementNode('q[0]', 'c0')], 'ZI')
+
+class TestMeasurement(unittest.TestCase):
+    def test_collapse_is_consistent(self):
+        """Measuring one half of a Bell pair fixes the other half."""
+        for seed in range(8):
+            sim = Simulator(num_qubits=2, seed=seed)
+            sim.apply_gate("H", [0])
+            sim.apply_gate("CNOT", [0, 1])
+            first = sim.measure(0)
+            self.assertEqual(sim.measure(1), first)
+            probs = sim.get_probabilities()
+            self.assertAlmostEqual(probs[f"{first}{first}"], 1.0)
+            self.assertAlmostEqual(np.sum(np.abs(sim.state)**2), 1.0)
+
+    def test_run_program_records_bits(self):
+        """MeasurementNodes collapse the state and fill classical_bits."""
+        program = [GateNode('X', 'q[0]'), MeasurementNode('q[0]', 'c0'),
+                   MeasurementNode('q[1]', 'c1')]
+        sim = Simulator(num_qubits=2)
+        sim.run_program(program)
+        self.assertEqual(sim.classical_bits, {'c0': 1, 'c1': 0})
+        self.assertEqual(sim.num_qubits, 2)
+
+    def test_drop_measured_qubits(self):
+        """Qubits unused after their measurement are removed from the state."""
+        program = [GateNode('H', 'q[0]'), GateNode('CNOT', 'q[0], q[1]'),
+                   MeasurementNode('q[0]', 'c0'), GateNode('X', 'q[2]'),
+                   GateNode('CNOT', 'q[1], q[2]'), MeasurementNode('q[2]', 'c2')]
+        sim = Simulator(num_qubits=3, seed=3)
+        sim.run_program(program, drop_measured=True)
+
+        c0 = sim.classical_bits['c0']
+        self.assertEqual(sim.classical_bits['c2'], 1 - c0)
+        self.assertEqual(sim.num_qubits, 1)
+        self.assertEqual(sim.active_qubits, [1])
+        self.assertEqual(len(sim.state), 2)
+        self.assertAlmostEqual(sim.get_probabilities()[str(c0)], 1.0)
+
+class TestCheckpoint(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "state.ckpt")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip(self):
+        """A saved state reloads bit-for-bit, with and without mmap."""
+        sim = Simulator(num_qubits=3)
+        sim.apply_gate("H", [0])
+        sim.apply_gate("RX", [2], angle=0.3)
+        sim.position = 7
+        sim.save_checkpoint(self.path)
+
+        for use_mmap in (True, False):
+            restored = Simulator.load_checkpoint(self.path, mmap=use_mmap)
+            self.assertEqual(restored.num_qubits, 3)
+            self.assertEqual(restored.position, 7)
+            np.testing.assert_array_equal(restored.get_statevector(), sim.state)
+        self.assertIsInstance(Simulator.load_checkpoint(self.path).state, np.memmap)
+
+    def test_mmap_is_copy_on_write(self):
+        """Gates applied after loading never modify the checkpoint file."""
+        sim = Simulator(num_qubits=2)
+        sim.save_checkpoint(self.path)
+        restored = Simulator.load_checkpoint(self.path)
+        restored.state[0] = 0.5
+        restored.apply_gate("X", [1])
+        again = Simulator.load_checkpoint(self.path)
+        self.assertEqual(again.state[0], 1.0)
+
+    def test_auto_checkpoint_and_resume(self):
+        """Resuming from an auto-checkpoint matches an uninterrupted run."""
+        program = [GateNode('H', 'q[0]'), GateNode('CNOT', 'q[0], q[1]'),
+                   GateNode('RX', 'q[1]', angle=0.7), GateNode('Z', 'q[0]'),
+                   GateNode('H', 'q[1]')]
+        full = Simulator(num_qubits=2)
+        full.run_program(program)
+
+        partial = Simulator(num_qubits=2)
+        partial.run_program(program[:3], checkpoint_path=self.path, checkpoint_every=3)
+        resumed = Simulator.load_checkpoint(self.path)
+        self.assertEqual(resumed.position, 3)
+        resumed.run_program(program, start=resumed.position)
+        np.testing.assert_allclose(resumed.state, full.state)
+
+    def test_resume_rejects_edited_program(self):
+        """A checkpoint only resumes a program whose executed part is unchanged."""
+        program = [GateNode('H', 'q[0]'), GateNode('RX', 'q[1]', angle=0.7),
+                   GateNode('CNOT', 'q[0], q[1]')]
+        Simulator(num_qubits=2).run_program(program[:2], checkpoint_path=self.path,
+                                            checkpoint_every=2)
+        for edited in ([GateNode('H', 'q[0]'), GateNode('RX', 'q[1]', angle=0.8)] + program[2:],
+                       [program[1], program[0]] + program[2:]):
+            with self.assertRaises(ValueError):
+                Simulator.load_checkpoint(self.path).run_program(edited, start=2)
+
+    def test_rejects_foreign_file(self):
+        with open(self.path, "wb") as f:
+            f.write(b"not a checkpoint")
+        with self.assertRaises(ValueError):
+            Simulator.load_checkpoint(self.path)
+
 if __name__ == '__main__':
     unittest.main()
 